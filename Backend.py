@@ -1,16 +1,41 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import google.generativeai as genai
-import logging
-from datetime import datetime
-from io import BytesIO
 import base64
-from flask import Flask, request, jsonify
+import logging
+from io import BufferedReader
+import multiprocessing
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from contextlib import nullcontext
+from flask import Flask, g, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import json
 import mysql.connector
+from mysql.connector.constants import FieldType
 import os
+import re
+import tempfile
+from bulk_write import BulkWriter, BulkWriteError
+from cost_guard import add_time_limit, estimate_cost, is_limitable
+from chart_cache import ChartCache
+from chart_intent import parse_chart_intent
+from conversation import ConversationStore, fold_turns
+from dataset_store import DatasetStore, QuotaExceeded
+from db_pool import ConnectionPools
+from llm_backend import gemini, shared_model
+from metrics import (prompt_chars, registry, request_seconds, request_spans, response_bytes, response_chars,
+                     result_rows, server_timing, span, turn_seconds, turn_tokens)
+from pipeline import Blocking, Generate, Parallel, run
+from prompt_cache import GEMINI_CACHE_MIN_TOKENS, PrefixCache, prompt_backend
+from result_cache import (CachedResult, DDL_STATEMENTS, WRITE_STATEMENTS, ResultCache, referenced_tables,
+                          sql_identifiers, statement_type)
+from result_stream import (PageTokens, arrow_available, arrow_stream, is_select, ndjson_stream, paginate_sql,
+                           strip_sql)
+from schema_catalog import SchemaCache
+from rate_limit import LLMLimiter
+from schema_retrieval import SchemaIndex, estimate_tokens
+from sql_cache import SQLCache, normalize_question
+from sql_validate import SQLValidator, clean_sql
+from tracing import RequestTrace, TraceBuffer
 
 
 
@@ -18,134 +43,556 @@ app = Flask(__name__)
 CORS(app)
 logging.basicConfig(level=logging.INFO)
 
-# Configure Generative AI model
+# Configure Generative AI model; LLM_BACKEND=fake or replay:<file> runs without Gemini (see llm_backend.py).
+# One client per process, created on the first LLM call (after the fork under gunicorn --preload).
 API_KEY = os.getenv("API_KEY")
-genai.configure(api_key= API_KEY)
-model = genai.GenerativeModel("gemini-1.5-flash")
+model = shared_model(api_key=API_KEY)
+
+# pandas, matplotlib and seaborn load on the first /upload or /visualize unless PRELOAD_CHARTS is set;
+# gunicorn.conf.py sets it with preload_app so workers share the master's copy instead of importing their own
+PRELOAD_CHARTS = os.getenv("PRELOAD_CHARTS", "0").lower() in ("1", "true", "yes")
+
+# Store user session data: uploads spill to node-local Feather files shared by all workers
+user_data = DatasetStore(
+    os.getenv("DATASET_DIR", os.path.join(tempfile.gettempdir(), "sql_agent_datasets")),
+    memory_budget=int(os.getenv("DATASET_MEMORY_BUDGET", 512 * 1024 * 1024)),
+    user_quota=int(os.getenv("DATASET_USER_QUOTA", 1024 * 1024 * 1024)),
+    idle_ttl=int(os.getenv("DATASET_IDLE_TTL", 86400))
+)
+
+# CSV ingestion: chunked parsing with numeric downcasting and categorical strings
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", 100000))
+CSV_CATEGORY_RATIO = float(os.getenv("CSV_CATEGORY_RATIO", 0.5))
+CSV_ARROW_DTYPES = os.getenv("CSV_ARROW_DTYPES", "false").lower() in ("1", "true", "yes")
+
+# Charts render in a spawn-based process pool (0 renders in the request thread)
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", os.cpu_count() or 1))
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", 120))
+chart_cache = ChartCache(
+    max_specs=int(os.getenv("CHART_SPEC_CACHE_SIZE", 5000)),
+    max_image_bytes=int(os.getenv("CHART_IMAGE_CACHE_BYTES", 128 * 1024 * 1024))
+)
+# Chart output negotiation: cheapest first, so the first format a client accepts is the one rendered
+CHART_FORMATS = ("vega-lite", "svg", "png")
+CHART_MEDIA_TYPES = {"vega-lite": "application/vnd.vegalite.v5+json", "svg": "image/svg+xml", "png": "image/png"}
+CHART_FORMAT_ALIASES = {"vega": "vega-lite", "vegalite": "vega-lite", "json": "vega-lite"}
+MAX_CHART_PIXELS = int(os.getenv("MAX_CHART_PIXELS", 4096))
+render_pool = None
+render_pool_lock = threading.Lock()
+
+def get_render_pool():
+    global render_pool
+    if render_pool is None and RENDER_WORKERS:
+        with render_pool_lock:
+            if render_pool is None:
+                render_pool = ProcessPoolExecutor(RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return render_pool
+
+# Schema catalogs are cached per connection profile
+SCHEMA_CACHE_TTL = int(os.getenv("SCHEMA_CACHE_TTL", 300))
+schema_cache = SchemaCache(SCHEMA_CACHE_TTL)
+
+# Prompts list only the SCHEMA_TOP_K most relevant tables (0 disables pruning);
+# set SCHEMA_EMBEDDING_MODEL to blend embedding similarity into the lexical ranking
+SCHEMA_TOP_K = int(os.getenv("SCHEMA_TOP_K", 8))
+SCHEMA_EMBEDDING_MODEL = os.getenv("SCHEMA_EMBEDDING_MODEL")
+SCHEMA_EMBEDDING_CACHE = os.getenv("SCHEMA_EMBEDDING_CACHE", ".schema_embeddings")
+
+def embed_texts(texts, task_type):
+    return gemini(API_KEY).embed_content(model=SCHEMA_EMBEDDING_MODEL, content=texts, task_type=task_type)['embedding']
+
+def embed_question(question):
+    # None when the embedding call fails; ranking then falls back to BM25 as it would inside SchemaIndex
+    try:
+        return embed_texts([question], "retrieval_query")[0]
+    except Exception as e:
+        logging.warning(f"Question embedding failed, using lexical ranking only: {e}")
+        return None
+
+def schema_index(schema):
+    # Built once per loaded catalog, so a schema refresh also rebuilds the index
+    if schema.index is None:
+        schema.index = SchemaIndex(
+            schema,
+            embed=embed_texts if SCHEMA_EMBEDDING_MODEL else None,
+            cache_dir=SCHEMA_EMBEDDING_CACHE
+        )
+    return schema.index
+
+# Pooled connections, one pool per connection profile
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_CHECKOUT_TIMEOUT = float(os.getenv("DB_CHECKOUT_TIMEOUT", 10))
+# CR_SERVER_GONE_ERROR, CR_SERVER_LOST, CR_SERVER_LOST_EXTENDED
+LOST_CONNECTION_ERRORS = {2006, 2013, 2055}
+NUMERIC_FIELD_TYPES = set(FieldType.get_number_types())
+
+# Generated SQL keyed by normalized question and schema checksum; set SQL_CACHE_PATH to persist it
+sql_cache = SQLCache(
+    max_entries=int(os.getenv("SQL_CACHE_SIZE", 1000)),
+    ttl=int(os.getenv("SQL_CACHE_TTL", 86400)),
+    path=os.getenv("SQL_CACHE_PATH")
+)
+
+# Generated SQL is checked against the cached schema before it reaches MySQL
+sql_validator = SQLValidator()
+
+# Serialized result pages, invalidated by TTL, table UPDATE_TIME or writes through execute_query.
+# MySQL 8 caches UPDATE_TIME for information_schema_stats_expiry seconds; set it to 0 for prompt invalidation.
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", 60))
+RESULT_CACHE_VERSION_TTL = float(os.getenv("RESULT_CACHE_VERSION_TTL", 5))
+
+# Result size limits; rows beyond MAX_RESULT_ROWS are never fetched from MySQL
+QUERY_PAGE_SIZE = int(os.getenv("QUERY_PAGE_SIZE", 1000))
+MAX_RESULT_ROWS = int(os.getenv("MAX_RESULT_ROWS", 100000))
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 1000))
+# Share PAGE_TOKEN_SECRET between workers so any of them can serve the next page
+page_tokens = PageTokens(os.getenv("PAGE_TOKEN_SECRET") or os.urandom(16).hex())
+
+# Uploaded datasets are written to MySQL in transactions of BULK_BATCH_SIZE rows (see bulk_write.py)
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 1000))
+
+# Generated SELECTs are EXPLAINed first; 0 disables the row budget or the time limit
+QUERY_ROW_BUDGET = int(os.getenv("QUERY_ROW_BUDGET", 1000000))
+QUERY_MAX_EXECUTION_MS = int(os.getenv("QUERY_MAX_EXECUTION_MS", 30000))
+
+# Finished request traces kept for /traces; 0 disables the buffer
+TRACE_MAX_STATES = int(os.getenv("TRACE_MAX_STATES", 50))
+trace_buffer = TraceBuffer(int(os.getenv("TRACE_BUFFER_SIZE", 200)))
+
+# Server-Timing header on every response, or on requests sending "X-Server-Timing: 1"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+
+# /query/batch: questions per batch, worker threads per batch, and a process-wide cap on concurrent
+# Gemini calls plus an optional LLM_RATE_LIMIT calls/second (0 disables it)
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", 100))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+llm_limiter = LLMLimiter(
+    concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 8)),
+    rate=float(os.getenv("LLM_RATE_LIMIT", 0)),
+    burst=int(os.getenv("LLM_RATE_BURST", 4))
+)
+
+# Speculative /query: "candidates" (default SPECULATIVE_CANDIDATES, 0/1 = off) SQL drafts are generated and
+# EXPLAINed concurrently; once one passes, the others get SPECULATIVE_GRACE_MS to beat it on rows examined
+SPECULATIVE_CANDIDATES = int(os.getenv("SPECULATIVE_CANDIDATES", 0))
+MAX_SPECULATIVE_CANDIDATES = int(os.getenv("MAX_SPECULATIVE_CANDIDATES", 5))
+SPECULATIVE_GRACE_MS = float(os.getenv("SPECULATIVE_GRACE_MS", 250))
+speculation_pool = ThreadPoolExecutor(int(os.getenv("SPECULATIVE_WORKERS", 16)), thread_name_prefix="speculate")
+
+# Multi-turn sessions: /query with a session_id sees the last CONVERSATION_MAX_TURNS turns verbatim and a
+# summary of older ones (CONVERSATION_SUMMARY=llm asks Gemini to write it instead of the local digest)
+CONVERSATION_MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", 4))
+CONVERSATION_SUMMARY_CHARS = int(os.getenv("CONVERSATION_SUMMARY_CHARS", 1500))
+CONVERSATION_SUMMARY = os.getenv("CONVERSATION_SUMMARY", "local")
+
+def llm_summary(summary, turns, max_chars):
+    recent = "\n".join(f"Q: {turn.question}\nSQL: {turn.sql}" for turn in turns)
+    prompt = f"""**Summary So Far:**
+{summary or "(none)"}
+
+**Turns To Add:**
+{recent}
+
+Update the summary of this conversation about a MySQL database in at most {max_chars} characters. Keep the
+tables, filters and groupings a follow-up question might refer back to. Return ONLY the summary."""
+    try:
+        with llm_limiter, span("llm_summarize"):
+            response = model.generate_content(prompt)
+        observe_llm("llm_summarize", prompt, response)
+        return response.text.strip()[:max_chars]
+    except Exception as e:
+        logging.warning(f"Conversation summary failed, using the local digest: {e}")
+        return fold_turns(summary, turns, max_chars)
+
+conversations = ConversationStore(
+    max_sessions=int(os.getenv("CONVERSATION_MAX_SESSIONS", 1000)),
+    ttl=int(os.getenv("CONVERSATION_TTL", 3600)),
+    max_turns=CONVERSATION_MAX_TURNS,
+    summary_chars=CONVERSATION_SUMMARY_CHARS,
+    summarize=llm_summary if CONVERSATION_SUMMARY == "llm" else None
+)
+
+# Static prompt prefixes (instructions + schema): the default PROMPT_CACHE=local still sends full prompts and
+# only counts prefix reuse; PROMPT_CACHE=gemini uploads prefixes of at least PROMPT_CACHE_MIN_TOKENS as Gemini
+# cached content, so later calls send only the question (see prompt_cache.py)
+prefix_cache = PrefixCache(
+    prompt_backend(
+        os.getenv("PROMPT_CACHE", "local"),
+        ttl=int(os.getenv("PROMPT_CACHE_TTL", 3600)),
+        min_tokens=int(os.getenv("PROMPT_CACHE_MIN_TOKENS", GEMINI_CACHE_MIN_TOKENS))
+    ),
+    max_entries=int(os.getenv("PROMPT_CACHE_ENTRIES", 64)),
+    ttl=int(os.getenv("PROMPT_CACHE_TTL", 3600))
+)
 
-# Store user session data
-user_data = {}
+def observe_llm(stage, prompt, response):
+    prompt_chars.observe(len(prompt), stage=stage)
+    try:
+        response_chars.observe(len(response.text), stage=stage)
+    except ValueError:
+        # Blocked or empty candidates have no text; accept_sql reports that
+        pass
 
 class StatefulSQLAgent:
-    def __init__(self, api_key):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-1.5-flash")
-        self.states = []
+    # One agent per request; the Gemini model, SQL cache, limiter, prompt cache and session are shared
+    def __init__(self, model, cache=None, limiter=None, prefixes=None, conversation=None):
+        self.model = model
+        self.cache = cache
+        self.limiter = limiter
+        self.prefixes = prefixes
+        self.conversation = conversation
+        self.trace = RequestTrace(TRACE_MAX_STATES)
         self.context = {}
+        self.usage = {"llm_calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "llm_ms": 0.0}
+        # Speculative candidates share the agent across threads
+        self.lock = threading.Lock()
+
+    @property
+    def states(self):
+        return self.trace.to_list()
 
     def log_state(self, state, message=None):
-        state_info = {
-            "state": state,
-            "message": message,
-            "timestamp": datetime.now().isoformat()
-        }
-        self.states.append(state_info)
+        record = self.trace.log(state, message)
         logging.info(f"State {state}: {message or ''}")
-        return state_info
+        return record
 
-    def generate_initial_sql(self, query, schema):
-        try:
-            self.log_state("PROCESS", "Generating initial SQL")
-            schema_info = "\n".join(
-                [f"Table {table} ({', '.join(columns)})" 
-                 for table, columns in schema.items()]
-            )
-            
-            prompt = f"""**Database Schema:**
-{schema_info}
+    def cache_question(self, query):
+        # A follow-up only means something relative to the SQL it follows, so that SQL is part of its cache key
+        last_sql = self.conversation.last_sql() if self.conversation else None
+        return f"{last_sql}\n{query}" if last_sql else query
+
+    def cached_sql(self, query, schema):
+        self.context['question'] = query
+        self.context['cache_hit'] = False
+        if self.cache is None:
+            return None
+        sql = self.cache.get(self.cache_question(query), schema.checksum)
+        if sql:
+            self.context['current_sql'] = sql
+            self.context['cache_hit'] = True
+            self.log_state("OBSERVATION", f"Cached SQL: {sql}")
+        return sql
+
+    def select_tables(self, query, schema, k):
+        tables = None
+        if SCHEMA_TOP_K and len(schema.tables) > SCHEMA_TOP_K:
+            # The question's embedding may already be computed (query_steps overlaps it with the schema load)
+            vector = self.context.get('embeddings', {}).get(query)
+            tables = schema_index(schema).top_tables(query, k, vector)
+        if tables and self.conversation is not None:
+            # Follow-ups keep the tables already in the session's prompt prefix so the prefix stays identical;
+            # refinement still widens the set when the model reaches outside it
+            pinned = self.conversation.pinned_tables(schema.checksum)
+            if pinned and k == SCHEMA_TOP_K:
+                tables = pinned
+            else:
+                tables = (pinned or []) + [table for table in tables if table not in (pinned or [])]
+                self.conversation.pin_tables(schema.checksum, tables)
+        full = schema_index(schema).full_tokens
+        pruned = estimate_tokens(schema.describe(tables)) if tables else full
+        self.context['tables'] = tables
+        self.context['schema_tokens'] = {"full": full, "pruned": pruned}
+        self.log_state("OBSERVATION", f"Schema prompt: {pruned} of {full} tokens, tables: {tables or 'all'}")
+        return tables
 
-**Natural Language Query:**
-{query}
+    def schema_info(self, schema, error=None):
+        if 'tables' not in self.context:
+            self.select_tables(self.context.get('question', ""), schema, SCHEMA_TOP_K)
+        tables = self.context['tables']
+        if tables and error and re.search(r"Unknown (column|table)|doesn't exist", error):
+            # The model reached outside the pruned tables; widen the set using the error text too
+            tables = self.select_tables(f"{self.context.get('question', '')} {error}", schema, SCHEMA_TOP_K * 2)
+        return schema.describe(tables)
 
-Generate a MySQL query that satisfies the request. Consider:
+    # Prompts are (prefix, delta) pairs: the prefix depends only on the schema tables, so it is shared by every
+    # call and turn against them and can be served from the prompt cache
+    def prompt_prefix(self, schema_info):
+        return f"""You write MySQL queries for the database below. Consider:
 1. Table relationships
 2. Appropriate JOINs
 3. Correct column names
 4. Proper aggregation if needed
 
-Return ONLY the SQL query without any explanations or formatting."""
-            
-            response = self.model.generate_content(prompt)
-            sql = response.text.strip().replace("```sql", "").replace("```", "").strip()
-            self.context['current_sql'] = sql
-            self.log_state("OBSERVATION", f"Generated initial SQL: {sql}")
-            return True, sql
-        except Exception as e:
-            return False, str(e)
+Return ONLY the SQL query without any explanations or formatting.
 
-    def refine_sql(self, error, schema):
-        try:
-            self.log_state("PROCESS", "Refining SQL based on error")
-            prompt = f"""**Previous Error:**
+**Database Schema:**
+{schema_info}
+
+"""
+
+    def initial_prompt(self, query, schema):
+        schema_info = schema.describe(self.select_tables(query, schema, SCHEMA_TOP_K))
+        history = self.conversation.prompt_block() if self.conversation else ""
+        follow_up = "\n\nAnswer the latest query, building on the conversation where it refers back to it." if history else ""
+        return self.prompt_prefix(schema_info), f"""{history}**Natural Language Query:**
+{query}{follow_up}"""
+
+    def candidate_prompt(self, prompt, index, count):
+        # Candidate 0 is the plain initial prompt; the others are nudged towards different formulations
+        prefix, delta = prompt
+        if index == 0:
+            return prompt
+        return prefix, f"""{delta}
+
+This is draft {index + 1} of {count}: if there is more than one sensible way to write the query, use a different formulation from the most obvious one."""
+
+    def refine_prompt(self, error, schema):
+        return self.prompt_prefix(self.schema_info(schema, error)), f"""**Previous Error:**
 {error}
 
 **Current SQL:**
 {self.context['current_sql']}
 
-**Database Schema:**
-{schema}
-
 Generate a corrected SQL query addressing the error. Return ONLY the SQL."""
-            
-            response = self.model.generate_content(prompt)
-            sql = response.text.strip().replace("```sql", "").replace("```", "").strip()
+
+    def optimize_prompt(self, cost, schema):
+        return self.prompt_prefix(self.schema_info(schema)), f"""**Current SQL:**
+{self.context['current_sql']}
+
+**Problem:**
+EXPLAIN estimates {cost['rows_examined']} rows examined, over the budget of {cost['budget']}.
+
+Rewrite the query so it returns the same answer while examining fewer rows: filter on indexed (PRI/UNI/MUL) columns, avoid functions on indexed columns and drop unnecessary JOINs. Return ONLY the SQL."""
+
+    def accept_sql(self, response, label):
+        sql = clean_sql(response.text)
+        self.context['current_sql'] = sql
+        self.log_state("OBSERVATION", f"{label}: {sql}")
+        return sql
+
+    def validate_sql(self, sql, schema):
+        # Returns (sql, error): near-miss identifiers come back fixed, anything else unknown as an error for refine_sql
+        with span("validate"):
+            sql, fixes, errors = sql_validator.validate(sql, schema)
+        if fixes:
             self.context['current_sql'] = sql
-            self.log_state("OBSERVATION", f"Refined SQL: {sql}")
-            return True, sql
+            self.log_state("OBSERVATION", f"Fixed locally ({'; '.join(fixes)}): {sql}")
+        if errors:
+            self.log_state("OBSERVATION", f"Failed validation: {'; '.join(errors)}")
+            return sql, "Validation failed before execution: " + "; ".join(errors)
+        return sql, None
+
+    def record_usage(self, prompt, usage, started):
+        if usage is None:
+            usage = {"prompt_tokens": estimate_tokens(prompt), "cached_tokens": 0}
+        with self.lock:
+            self.usage['llm_calls'] += 1
+            self.usage['prompt_tokens'] += usage['prompt_tokens']
+            self.usage['cached_tokens'] += usage['cached_tokens']
+            self.usage['llm_ms'] += (time.perf_counter() - started) * 1000
+
+    def generate(self, prompt, stage):
+        prefix, delta = prompt
+        started, usage = time.perf_counter(), None
+        with self.limiter or nullcontext(), span(stage):
+            if self.prefixes is not None:
+                response, usage = self.prefixes.generate(self.model, prefix, delta)
+            else:
+                response = self.model.generate_content(prefix + delta)
+        self.record_usage(prefix + delta, usage, started)
+        observe_llm(stage, prefix + delta, response)
+        return response
+
+    async def generate_async(self, prompt, stage):
+        prefix, delta = prompt
+        started, usage = time.perf_counter(), None
+        with span(stage):
+            if self.prefixes is not None:
+                response, usage = await self.prefixes.generate_async(self.model, prefix, delta)
+            else:
+                response = await self.model.generate_content_async(prefix + delta)
+        self.record_usage(prefix + delta, usage, started)
+        observe_llm(stage, prefix + delta, response)
+        return response
+
+    # SQL-producing steps as pipeline generators (see pipeline.py), shared by the Flask and async servers;
+    # the tuple-returning methods below run them in the calling thread. Prompts are built in a blocking step:
+    # with SCHEMA_EMBEDDING_MODEL set, ranking the tables can call the embedding API.
+    def initial_sql_steps(self, query, schema):
+        sql = self.cached_sql(query, schema)
+        if sql:
+            return sql
+        self.log_state("PROCESS", "Generating initial SQL")
+        prompt = yield Blocking("work", self.initial_prompt, query, schema)
+        response = yield Generate(self, prompt, "llm_generate")
+        return self.accept_sql(response, "Generated initial SQL")
+
+    def refine_sql_steps(self, error, schema):
+        self.log_state("PROCESS", "Refining SQL based on error")
+        prompt = yield Blocking("work", self.refine_prompt, error, schema)
+        response = yield Generate(self, prompt, "llm_refine")
+        return self.accept_sql(response, "Refined SQL")
+
+    def optimize_sql_steps(self, cost, schema):
+        self.log_state("PROCESS", "Rewriting SQL to fit the row budget")
+        prompt = yield Blocking("work", self.optimize_prompt, cost, schema)
+        response = yield Generate(self, prompt, "llm_optimize")
+        return self.accept_sql(response, "Optimized SQL")
+
+    def generate_initial_sql(self, query, schema):
+        try:
+            return True, run(self.initial_sql_steps(query, schema))
+        except Exception as e:
+            return False, str(e)
+
+    def refine_sql(self, error, schema):
+        try:
+            return True, run(self.refine_sql_steps(error, schema))
         except Exception as e:
             return False, str(e)
 
 class DatabaseManager:
-    def __init__(self):
-        self.connection = None
-        self.cursor = None
+    def __init__(self, pools):
+        self.pools = pools
+        self.profile = None
 
     def connect(self, host, user, password, database, port):
         try:
-            self.connection = mysql.connector.connect(
-                host=host,
-                user=user,
-                password=password,
-                database=database,
-                port=port,
-                autocommit=True
-            )
-            self.cursor = self.connection.cursor(dictionary=True)
+            self.profile = self.pools.register(host, user, password, database, port)
             return True, "Connected successfully"
         except mysql.connector.Error as err:
             return False, f"MySQL Error: {err}"
 
-    def get_schema(self):
+    def run(self, action, profile=None):
+        # Borrow a pooled connection per call; retry once if the server dropped it mid-query
+        profile = profile or self.profile
+        for attempt in range(2):
+            try:
+                with self.pools.connection(profile) as connection:
+                    cursor = connection.cursor(dictionary=True)
+                    try:
+                        return action(connection, cursor)
+                    finally:
+                        cursor.close()
+            except (mysql.connector.OperationalError, mysql.connector.InterfaceError) as err:
+                if attempt or err.errno not in LOST_CONNECTION_ERRORS:
+                    raise
+                logging.warning(f"Lost connection to {profile}, retrying: {err}")
+
+    def get_schema(self, refresh=False, profile=None):
+        profile = profile or self.profile
         try:
-            schema = {}
-            tables = self.get_tables()
-            for table in tables:
-                columns = self.get_columns(table)
-                schema[table] = columns
+            with span("schema"):
+                schema = self.run(
+                    lambda connection, cursor: schema_cache.get(profile, cursor, connection.database, refresh),
+                    profile
+                )
             return True, schema
         except Exception as e:
             return False, str(e)
 
-    def get_tables(self):
-        self.cursor.execute("SHOW TABLES")
-        return [row[f"Tables_in_{self.connection.database}"] for row in self.cursor.fetchall()]
+    def get_tables(self, profile=None):
+        def action(connection, cursor):
+            cursor.execute("SHOW TABLES")
+            return [row[f"Tables_in_{connection.database}"] for row in cursor.fetchall()]
+        return self.run(action, profile)
 
-    def get_columns(self, table):
-        self.cursor.execute(f"DESCRIBE {table}")
-        return [row['Field'] for row in self.cursor.fetchall()]
+    def get_columns(self, table, profile=None):
+        def action(connection, cursor):
+            cursor.execute(f"DESCRIBE {table}")
+            return [row['Field'] for row in cursor.fetchall()]
+        return self.run(action, profile)
 
-    def execute_query(self, query):
+    def explain(self, query, profile=None):
+        def action(connection, cursor):
+            cursor.execute(f"EXPLAIN FORMAT=JSON {query}")
+            return estimate_cost(cursor.fetchone()['EXPLAIN'])
         try:
-            self.cursor.execute(query)
-            if self.cursor.with_rows:
-                return self.cursor.fetchall(), None
-            return "Query executed successfully", None
+            with span("db_explain"):
+                return self.run(action, profile), None
         except mysql.connector.Error as err:
             return None, f"MySQL Error: {err}"
 
+    def result_columns(self, query, profile=None):
+        # (name, is_numeric) for each column of a SELECT, from a LIMIT 0 wrapper: no rows are read
+        def action(connection, cursor):
+            cursor.execute(f"SELECT * FROM ({strip_sql(query)}) AS q LIMIT 0")
+            cursor.fetchall()
+            return [(column[0], column[1] in NUMERIC_FIELD_TYPES) for column in cursor.description]
+        try:
+            with span("db_describe"):
+                return self.run(action, profile), None
+        except mysql.connector.Error as err:
+            return None, f"MySQL Error: {err}"
+
+    def table_versions(self, profile=None):
+        def action(connection, cursor):
+            cursor.execute(
+                "SELECT TABLE_NAME AS table_name, UPDATE_TIME AS update_time "
+                "FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()"
+            )
+            return {row['table_name']: str(row['update_time']) for row in cursor.fetchall()}
+        try:
+            return self.run(action, profile)
+        except mysql.connector.Error as err:
+            logging.warning(f"Could not read table versions: {err}")
+            return {}
+
+    def execute_query(self, query, profile=None, limit=None, offset=0):
+        kind = statement_type(query)
+        if limit is not None and is_select(query):
+            query = paginate_sql(query, limit, offset)
+        if is_select(query):
+            query = add_time_limit(query, QUERY_MAX_EXECUTION_MS)
+
+        def action(connection, cursor):
+            cursor.execute(query)
+            if cursor.with_rows:
+                return cursor.fetchall()
+            return "Query executed successfully"
+        try:
+            with span("db_execute"):
+                result = self.run(action, profile)
+        except mysql.connector.Error as err:
+            return None, f"MySQL Error: {err}"
+        if isinstance(result, list):
+            result_rows.observe(len(result))
+        if kind in WRITE_STATEMENTS:
+            result_cache.invalidate(profile or self.profile, sql_identifiers(query))
+            if kind in DDL_STATEMENTS:
+                schema_cache.invalidate(profile or self.profile)
+        return result, None
+
+    def load_frame(self, table, df, profile=None, create=False, atomic=False, batch_size=BULK_BATCH_SIZE):
+        # Raises BulkWriteError with the progress report; never retried, since batches may already be committed
+        profile = profile or self.profile
+        try:
+            with span("db_bulk_load"), self.pools.connection(profile) as connection:
+                return BulkWriter(connection, batch_size, atomic).load_frame(table, df, create)
+        finally:
+            result_cache.invalidate(profile, [table])
+            if create:
+                schema_cache.invalidate(profile)
+
+    def stream_query(self, query, profile=None, batch_size=1000, limit=None):
+        # Unbuffered cursor: rows are pulled from the server one batch at a time
+        if limit is not None:
+            query = paginate_sql(query, limit)
+        query = add_time_limit(query, QUERY_MAX_EXECUTION_MS)
+        with self.pools.connection(profile or self.profile) as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                cursor.execute(query)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                # The client may hang up mid-stream; drain before the connection goes back to the pool
+                if connection.unread_result:
+                    connection.consume_results()
+                cursor.close()
+
 class AIVisualizer:
-    def __init__(self, df):
+    def __init__(self, df, dataset_path=None, fingerprint=None, profile=None, llm=None):
         self.df = df
+        self.model = llm or model
+        self.dataset_path = dataset_path
+        self.fingerprint = fingerprint
+        self.profile = profile
+        self.path = None
         self.state = "START"
         self.log_state("Initialization complete.")
 
@@ -153,11 +600,55 @@ class AIVisualizer:
         logging.info(f"State: {self.state} | {message}")
         self.state = message
 
-    def generate_visualization(self, query):
+    def generate_visualization(self, query, fmt="png", width=800, height=600, dpi=100):
+        with span("chart_spec"):
+            spec = self.choose_spec(query)
+        if spec is None:
+            return None
+        return self.create_plot(spec["visualization"], spec["columns"], fmt, width, height, dpi)
+
+    def choose_spec(self, query):
+        # Cheapest first: cached spec, then the local keyword/column parser, then Gemini
+        spec = chart_cache.get_spec(self.fingerprint, query) if self.fingerprint else None
+        if spec:
+            self.path = "cache"
+            self.log_state("PROCESS - Using cached chart spec")
+            return spec
+
+        spec = parse_chart_intent(query, self.column_names(), self.numeric_names())
+        if spec:
+            self.path = "rules"
+            self.log_state(f"PROCESS - Rule-based chart spec: {spec}")
+            return spec
+
+        self.path = "llm"
+        spec = self.llm_spec(query)
+        if spec and self.fingerprint:
+            chart_cache.put_spec(self.fingerprint, query, spec)
+        return spec
+
+    def column_names(self):
+        return list(self.df.columns)
+
+    def numeric_names(self):
+        from column_profile import numeric_columns
+
+        if self.profile:
+            return numeric_columns(self.profile)
+        return self.df.select_dtypes("number").columns.tolist()
+
+    def llm_spec(self, query):
         self.log_state("PROCESS - AI interpreting query")
 
+        from column_profile import describe_profile
+
+        # The upload-time profile tells the model dtypes, ranges and categories, not just names
+        columns = self.column_names()
+        if self.profile:
+            columns = f"{columns}:\n{describe_profile(self.profile)}\n"
+
         prompt = f"""
-        Given the dataset with columns {list(self.df.columns)}, interpret the following query:
+        Given the dataset with columns {columns}, interpret the following query:
         "{query}"
         
         Identify the visualization type from: ["histogram", "scatter plot", "box plot", "bar chart", "pair plot", "pie chart", "heatmap"].
@@ -173,7 +664,9 @@ class AIVisualizer:
 
 
         try:
-            response = model.generate_content(prompt)
+            with span("llm_chart_spec"):
+                response = self.model.generate_content(prompt)
+            observe_llm("llm_chart_spec", prompt, response)
             response_text = response.text.strip() if response and response.text else ""
 
             logging.info(f"AI Response: {response_text}")
@@ -195,7 +688,7 @@ class AIVisualizer:
                     self.log_state("ERROR - Missing keys in AI response.")
                     return None
 
-                return self.create_plot(vis_type, columns)
+                return {"visualization": vis_type, "columns": columns}
             except json.JSONDecodeError:
                 self.log_state("ERROR - Failed to interpret AI response: Invalid JSON format.")
                 return None
@@ -204,44 +697,133 @@ class AIVisualizer:
             self.log_state(f"ERROR - Unexpected error: {e}")
             return None
     
-    def create_plot(self, vis_type, columns):
-        self.log_state(f"PROCESS - Generating {vis_type} for {columns}")
-        plt.figure(figsize=(8, 6))
+    def create_plot(self, vis_type, columns, fmt="png", width=800, height=600, dpi=100):
+        # Returns the chart as raw bytes: PNG, SVG, or a Vega-Lite JSON spec with its data inlined
+        from plot_reduction import is_supported
+
+        self.log_state(f"PROCESS - Generating {fmt} {vis_type} for {columns}")
+        if not is_supported(vis_type, columns):
+            self.log_state("ERROR - Unknown visualization type")
+            return None
+
+        variant = f"{fmt}:{width}x{height}" if fmt != "png" else f"png:{width}x{height}@{dpi}"
+        if self.fingerprint:
+            image = chart_cache.get_image(self.fingerprint, vis_type, columns, variant)
+            if image:
+                self.log_state("PROCESS - Using cached chart")
+                return image
 
         try:
-            if vis_type == "histogram":
-                sns.histplot(self.df[columns[0]], kde=True)
-            elif vis_type == "scatter plot" and len(columns) >= 2:
-                sns.scatterplot(x=self.df[columns[0]], y=self.df[columns[1]])
-            elif vis_type == "box plot":
-                sns.boxplot(x=self.df[columns[0]])
-            elif vis_type == "bar chart":
-                self.df[columns[0]].value_counts().plot(kind='bar')
-            elif vis_type == "line graph":
-                self.df[columns].plot(kind='line')
-            elif vis_type == "pie chart":
-                self.df[columns[0]].value_counts().plot(kind='pie', autopct='%1.1f%%')
-            elif vis_type == "heatmap":
-                sns.heatmap(self.df.corr(), annot=True, cmap="coolwarm")
-            else:
-                self.log_state("ERROR - Unknown visualization type")
-                return None
-            
-            return self._plot_to_base64()
+            with span("render"):
+                image = self.render(vis_type, columns, fmt, width, height, dpi)
         except Exception as e:
             self.log_state(f"ERROR - Failed to generate plot: {e}")
             return None
-    
-    def _plot_to_base64(self):
-        buf = BytesIO()
-        plt.savefig(buf, format='png')
-        plt.close()
-        buf.seek(0)
-        return base64.b64encode(buf.read()).decode('utf-8')
+
+        if self.fingerprint:
+            chart_cache.put_image(self.fingerprint, vis_type, columns, image, variant)
+        return image
+
+    def render(self, vis_type, columns, fmt, width, height, dpi):
+        if fmt == "vega-lite":
+            from chart_vega import vega_lite_spec
+
+            # Aggregation only, nothing is drawn: cheap enough to stay in the request thread
+            return json.dumps(vega_lite_spec(self.df, vis_type, columns, self.profile, width, height)).encode()
+        from chart_render import render_chart, render_file
+
+        pool = get_render_pool()
+        if pool is not None and self.dataset_path:
+            return pool.submit(
+                render_file, self.dataset_path, vis_type, columns, self.profile, fmt, width, height, dpi
+            ).result(timeout=RENDER_TIMEOUT)
+        return render_chart(self.df, vis_type, columns, self.profile, fmt, width, height, dpi)
+
+class QueryVisualizer(AIVisualizer):
+    # Charts a generated SELECT without fetching its rows: chart_sql aggregates it in MySQL
+    # and only the reduced series is rendered
+    def __init__(self, sql, columns, db_profile=None, llm=None):
+        super().__init__(None, llm=llm)
+        self.sql = sql
+        self.columns = [name for name, _ in columns]
+        self.numeric = [name for name, numeric in columns if numeric]
+        self.db_profile = db_profile
+
+    def column_names(self):
+        return self.columns
+
+    def numeric_names(self):
+        return self.numeric
+
+    def run(self, sql):
+        # Each aggregate scans the whole query result, so it is held to the same row budget as /query. Over budget
+        # it is rejected rather than optimized: the optimize prompt rewrites the agent's base SELECT, not this
+        # aggregate.
+        cost, error = db_manager.explain(sql, self.db_profile)
+        if error:
+            raise Exception(error)
+        if QUERY_ROW_BUDGET and cost['rows_examined'] > QUERY_ROW_BUDGET:
+            raise Exception(f"Chart query rejected: EXPLAIN estimates {cost['rows_examined']} rows examined, "
+                            f"over the budget of {QUERY_ROW_BUDGET}")
+        result, error = db_manager.execute_query(sql, self.db_profile)
+        if error:
+            raise Exception(error)
+        return result
+
+    def render(self, vis_type, columns, fmt, width, height, dpi):
+        from chart_sql import chart_data
+
+        unknown = [column for column in columns if column not in self.columns]
+        if unknown:
+            raise ValueError(f"Columns not in the query result: {unknown}")
+        with span("db_aggregate"):
+            self.df, self.profile = chart_data(self.run, self.sql, vis_type, columns, self.numeric)
+        pool = get_render_pool()
+        if fmt != "vega-lite" and pool is not None:
+            from chart_render import render_chart
+
+            # The reduced frame is small enough to hand to a render worker directly
+            return pool.submit(
+                render_chart, self.df, vis_type, columns, self.profile, fmt, width, height, dpi
+            ).result(timeout=RENDER_TIMEOUT)
+        return super().render(vis_type, columns, fmt, width, height, dpi)
 
 # Initialize components
-db_manager = DatabaseManager()
-llm_agent = StatefulSQLAgent(API_KEY)
+db_manager = DatabaseManager(ConnectionPools(DB_POOL_SIZE, DB_CHECKOUT_TIMEOUT))
+result_cache = ResultCache(RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL, db_manager.table_versions, RESULT_CACHE_VERSION_TTL)
+registry.collect("sql_cache", sql_cache.stats)
+registry.collect("result_cache", result_cache.stats)
+registry.collect("chart_cache", chart_cache.stats)
+registry.collect("datasets", user_data.stats)
+registry.collect("validation", sql_validator.stats)
+registry.collect("prompt_cache", prefix_cache.stats)
+registry.collect("sessions", conversations.stats)
+
+@app.before_request
+def start_timing():
+    g.started = time.perf_counter()
+    g.spans = request_spans.set([])
+
+@app.after_request
+def record_timing(response):
+    elapsed = time.perf_counter() - g.started
+    endpoint = request.endpoint or "unknown"
+    request_seconds.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+    if response.content_length is not None:
+        response_bytes.observe(response.content_length, endpoint=endpoint)
+    if SERVER_TIMING or request.headers.get('X-Server-Timing') == "1":
+        # Streamed bodies are still being produced, so their breakdown stops at the first byte
+        response.headers['Server-Timing'] = server_timing(request_spans.get() + [("total", elapsed)])
+    return response
+
+@app.teardown_request
+def stop_timing(exc):
+    if 'spans' in g:
+        request_spans.reset(g.pop('spans'))
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route('/connect', methods=['GET','POST'])
 def connect():
@@ -253,46 +835,119 @@ def connect():
         data['database'],
         data['port']
     )
-    return jsonify({"success": success, "message": message})
+    return jsonify({"success": success, "message": message, "profile": db_manager.profile if success else None})
+
+@app.route('/schema/refresh', methods=['GET','POST'])
+def refresh_schema():
+    data = request.get_json(silent=True) or {}
+    success, schema = db_manager.get_schema(refresh=True, profile=data.get('profile'))
+    if not success:
+        return jsonify({"success": False, "message": schema}), 500
+    return jsonify({
+        "success": True,
+        "tables": len(schema.tables),
+        "checksum": schema.checksum
+    })
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "sql": sql_cache.stats(),
+        "results": result_cache.stats(),
+        "datasets": user_data.stats(),
+        "charts": chart_cache.stats(),
+        "validation": sql_validator.stats(),
+        "prompts": prefix_cache.stats(),
+        "sessions": conversations.stats()
+    })
+
+@app.route('/sessions/<session_id>', methods=['GET', 'DELETE'])
+def session(session_id):
+    if request.method == 'DELETE':
+        return jsonify({"success": conversations.drop(session_id)})
+    conversation = conversations.get(session_id, create=False)
+    if conversation is None:
+        return jsonify({"success": False, "message": "Unknown session"}), 404
+    return jsonify(conversation.to_dict())
+
+def query_options(data):
+    # Parses a /query body; ValueError means the request itself is bad (400)
+    if not isinstance(data, dict) or not data.get('query'):
+        raise ValueError("Expected a JSON object with a query")
+    try:
+        page_size = min(int(data.get('page_size', QUERY_PAGE_SIZE)), MAX_RESULT_ROWS)
+        candidates = min(int(data.get('candidates', SPECULATIVE_CANDIDATES)), MAX_SPECULATIVE_CANDIDATES)
+    except (TypeError, ValueError):
+        raise ValueError("page_size and candidates must be integers")
+    return {
+        "query": str(data['query']),
+        "profile": data.get('profile') or db_manager.profile,
+        "streaming": bool(data.get('stream')),
+        "format": data.get('format', 'ndjson'),
+        "page_size": page_size,
+        "candidates": candidates
+    }
+
+def query_agent(data):
+    # A session_id turns /query into a conversation: earlier turns are part of the prompt
+    conversation = conversations.get(str(data['session_id'])) if data.get('session_id') else None
+    llm_agent = StatefulSQLAgent(model, sql_cache, prefixes=prefix_cache, conversation=conversation)
+    llm_agent.log_state("START")
+    return llm_agent
+
+def query_steps(llm_agent, options, started):
+    # /query from schema load to response metadata. Returns (answer, meta); answer['page'] is None when the
+    # rows are to be streamed.
+    question, profile = options['query'], options['profile']
+    llm_agent.log_state("INPUT", f"Received query: {question}")
+    # Embedding the question for table ranking needs no schema, so it overlaps the schema load
+    steps = [Blocking("db", db_manager.get_schema, profile=profile)]
+    if SCHEMA_EMBEDDING_MODEL:
+        steps.append(Blocking("work", embed_question, question))
+    (success, schema), *vector = yield Parallel(*steps)
+    if not success:
+        raise Exception(schema)
+    if vector and vector[0] is not None:
+        llm_agent.context['embeddings'] = {question: vector[0]}
+    if schema.index is None:
+        # First request against a freshly loaded catalog: building the index embeds every table description
+        yield Blocking("work", schema_index, schema)
+
+    answer = yield from answer_steps(llm_agent, question, schema, profile, options['page_size'],
+                                     options['streaming'], options['candidates'])
+    meta = {
+        "sql": answer['sql'],
+        "cost": answer['cost'],
+        "schema_tokens": llm_agent.context.get('schema_tokens'),
+        "cached": answer['cached'],
+        # record_turn may call Gemini to summarise old turns
+        "usage": (yield Blocking("work", record_turn, llm_agent, question, answer['sql'], started))
+    }
+    if answer['speculation']:
+        meta['speculation'] = answer['speculation']
+    conversation = llm_agent.conversation
+    if conversation is not None:
+        meta['session'] = {"session_id": conversation.session_id, "turn": conversation.turn_count}
+    return answer, meta
+
+def query_envelope(llm_agent, answer, meta):
+    # The JSON body of a paged /query answer; the rows are spliced in by page_body
+    return {"status": "success", **meta, "result_cached": answer['result_cached'], "states": llm_agent.states}
 
 @app.route('/query', methods=['GET','POST'])
 def handle_query():
-    data = request.json
-    llm_agent.log_state("START")
-    
+    data = request.get_json(silent=True)
     try:
-        llm_agent.log_state("INPUT", f"Received query: {data['query']}")
-        
-        # Get schema information
-        success, schema = db_manager.get_schema()
-        if not success:
-            raise Exception(schema)
-        
-        # Generate initial SQL
-        success, sql = llm_agent.generate_initial_sql(data['query'], schema)
-        if not success:
-            raise Exception(sql)
-        
-        # Refinement loop
-        max_retries = 3
-        for attempt in range(max_retries):
-            result, error = db_manager.execute_query(sql)
-            if error:
-                success, sql = llm_agent.refine_sql(error, schema)
-                if not success:
-                    raise Exception(sql)
-            else:
-                llm_agent.log_state("OUTPUT", "Query executed successfully")
-                llm_agent.log_state("STOP", "Process completed successfully")
-                return jsonify({
-                    "status": "success",
-                    "result": result,
-                    "sql": sql,
-                    "states": llm_agent.states
-                })
-        
-        raise Exception("Maximum refinement attempts reached")
-    
+        options = query_options(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    llm_agent = query_agent(data)
+    try:
+        answer, meta = run(query_steps(llm_agent, options, g.started))
+        if answer['page'] is None:
+            return stream_rows(answer['sql'], options['profile'], options['format'],
+                               {**meta, "states": llm_agent.states})
+        return page_response(query_envelope(llm_agent, answer, meta), answer['page'])
     except Exception as e:
         llm_agent.log_state("STOP", f"Process failed: {str(e)}")
         return jsonify({
@@ -300,26 +955,461 @@ def handle_query():
             "message": str(e),
             "states": llm_agent.states
         }), 500
+    finally:
+        trace_buffer.add(llm_agent.trace)
+
+def record_turn(llm_agent, question, sql, started):
+    # Per-turn latency and prompt tokens; a follow-up is any turn after the first in a session
+    conversation = llm_agent.conversation
+    turn = "follow_up" if conversation is not None and conversation.turn_count else "first"
+    if conversation is not None:
+        conversation.add(question, sql)
+    usage = {**llm_agent.usage, "llm_ms": round(llm_agent.usage['llm_ms'], 1),
+             "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+    turn_seconds.observe(usage['elapsed_ms'] / 1000, turn=turn)
+    if usage['llm_calls']:
+        turn_tokens.observe(usage['prompt_tokens'] - usage['cached_tokens'], turn=turn, part="sent")
+        turn_tokens.observe(usage['cached_tokens'], turn=turn, part="cached")
+    return usage
+
+def check_candidate(llm_agent, prompt, schema, profile, stop):
+    # One speculative draft: generate, validate and EXPLAIN without touching the agent's current SQL
+    candidate = {"sql": None, "cost": None, "error": None, "within_budget": False}
+    started = time.perf_counter()
+    try:
+        response = llm_agent.generate(prompt, "llm_candidate")
+        candidate['sql'] = clean_sql(response.text)
+    except Exception as e:
+        candidate['error'] = str(e)
+    candidate['llm_ms'] = (time.perf_counter() - started) * 1000
+    if candidate['error'] or stop.is_set():
+        candidate['error'] = candidate['error'] or "cancelled"
+        candidate['check_ms'] = 0.0
+        return candidate
+
+    checked = time.perf_counter()
+    with span("validate"):
+        sql, fixes, errors = sql_validator.validate(candidate['sql'], schema)
+    candidate['sql'] = sql
+    if errors:
+        candidate['error'] = "Validation failed before execution: " + "; ".join(errors)
+    elif is_select(sql):
+        cost, candidate['error'] = db_manager.explain(sql, profile)
+        if cost is not None:
+            within = not QUERY_ROW_BUDGET or cost['rows_examined'] <= QUERY_ROW_BUDGET
+            cost.update(budget=QUERY_ROW_BUDGET, action="ok" if within else "limited")
+            candidate['cost'] = cost
+            candidate['within_budget'] = within or is_limitable(sql, cost)
+    else:
+        candidate['within_budget'] = True
+    candidate['check_ms'] = (time.perf_counter() - checked) * 1000
+    return candidate
+
+def speculate(llm_agent, question, schema, profile, count):
+    # Drafts race on speculation_pool; the cheapest one that validated and EXPLAINed within budget wins.
+    # Returns (report, (sql, cost, error)) where a non-None error sends the winner on to refine_sql.
+    started = time.perf_counter()
+    prompt = llm_agent.initial_prompt(question, schema)
+    if llm_agent.prefixes is not None:
+        # Every draft shares this prefix: create its cache entry once, before the drafts race for it
+        llm_agent.prefixes.prepare(llm_agent.model, prompt[0])
+    stop = threading.Event()
+    # Drafts multiply Gemini load, so they always go through the process-wide limiter
+    llm_agent.limiter = llm_agent.limiter or llm_limiter
+    llm_agent.log_state("PROCESS", f"Generating {count} candidate SQL drafts")
+    futures = {
+        speculation_pool.submit(check_candidate, llm_agent, llm_agent.candidate_prompt(prompt, index, count),
+                                schema, profile, stop): index
+        for index in range(count)
+    }
+    finished, pending, decided = [], set(futures), None
+    with span("speculate"):
+        while pending:
+            timeout = None if decided is None else max(0.0, decided + SPECULATIVE_GRACE_MS / 1000 - time.perf_counter())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"sql": None, "cost": None, "error": str(e), "within_budget": False,
+                              "llm_ms": 0.0, "check_ms": 0.0}
+                candidate = {**result, "index": futures[future], "finished": time.perf_counter() - started}
+                finished.append(candidate)
+                llm_agent.log_state("OBSERVATION", f"Candidate {candidate['index'] + 1}: "
+                                    f"{candidate['error'] or 'valid'} {candidate['sql'] or ''}")
+                if decided is None and not candidate['error'] and candidate['within_budget']:
+                    decided = time.perf_counter()
+        # Drafts still queued are dropped; in-flight Gemini calls cannot be aborted, so their results are ignored
+        stop.set()
+        cancelled = sum(future.cancel() for future in pending)
+
+    valid = [candidate for candidate in finished if not candidate['error']]
+    ranked = sorted(valid, key=lambda c: (not c['within_budget'], c['cost']['rows_examined'] if c['cost'] else 0,
+                                          c['finished']))
+    winner = ranked[0] if ranked else min(finished, key=lambda c: (c['sql'] is None, c['finished']))
+    elapsed = (time.perf_counter() - started) * 1000
+    # The sequential loop works through drafts one at a time (each failure costs a refinement round trip)
+    # until one passes; the finished drafts, in order, stand in for those rounds
+    sequential = 0.0
+    for candidate in sorted(finished, key=lambda c: c['finished']):
+        sequential += candidate['llm_ms'] + candidate['check_ms']
+        if not candidate['error'] and candidate['within_budget']:
+            break
+    report = {
+        "candidates": count,
+        "tried": len(finished),
+        "valid": len(valid),
+        "cancelled": cancelled,
+        "winner": winner['index'] + 1,
+        "elapsed_ms": round(elapsed, 1),
+        "sequential_estimate_ms": round(sequential, 1),
+        "saved_ms": round(sequential - elapsed, 1)
+    }
+    llm_agent.context['current_sql'] = winner['sql']
+    llm_agent.log_state("OBSERVATION", f"Speculation picked candidate {report['winner']} of {count}: {winner['sql']}")
+    if winner['sql'] is None:
+        raise Exception(winner['error'])
+    # A winner over the row budget goes through cost_steps again so it can be rewritten
+    cost = winner['cost'] if winner['within_budget'] else None
+    return report, (winner['sql'], cost, winner['error'])
+
+def answer_query(llm_agent, question, schema, profile, page_size, streaming=False, candidates=1):
+    return run(answer_steps(llm_agent, question, schema, profile, page_size, streaming, candidates))
+
+def answer_steps(llm_agent, question, schema, profile, page_size, streaming=False, candidates=1):
+    # Generate SQL, cost-check and run it, feeding errors back to the model up to three times.
+    # Returns the final SQL with its cost and first result page; the page is None when the rows are to be streamed.
+    # With candidates > 1 the first round is speculative: several drafts are generated and checked in parallel.
+    speculation, checked = None, None
+    if candidates > 1 and not llm_agent.cached_sql(question, schema):
+        # speculate() waits on its own thread pool, so it is one blocking step here
+        speculation, checked = yield Blocking("work", speculate, llm_agent, question, schema, profile, candidates)
+        sql = checked[0]
+    elif candidates > 1:
+        sql = llm_agent.context['current_sql']
+    else:
+        sql = yield from llm_agent.initial_sql_steps(question, schema)
+
+    max_retries = 3
+    for attempt in range(max_retries):
+        cost, page = None, None
+        if checked is not None:
+            # Already validated and EXPLAINed by speculate()
+            (sql, cost, error), checked = checked, None
+        else:
+            sql, error = llm_agent.validate_sql(sql, schema)
+        if not error and not streaming and is_select(sql):
+            with span("result_cache"):
+                page = yield Blocking("db", result_cache.get, profile, sql, page_size)
+        if page is None and not error and is_select(sql) and cost is None:
+            sql, cost, error = yield from cost_steps(llm_agent, sql, schema, profile)
+        if page is None and not error:
+            # Streaming validates with LIMIT 0 and fetches rows afterwards; paging reads one row extra to detect more
+            result, error = yield Blocking("db", db_manager.execute_query, sql, profile,
+                                           limit=0 if streaming else page_size + 1)
+        if error:
+            sql = yield from llm_agent.refine_sql_steps(error, schema)
+            continue
+
+        # Only SQL that actually ran is worth remembering
+        sql_cache.put(llm_agent.cache_question(question), schema.checksum, sql)
+        llm_agent.log_state("OUTPUT", "Query executed successfully" if page is None else "Served cached result")
+        llm_agent.log_state("STOP", "Process completed successfully")
+        answer = {
+            "sql": sql,
+            "cost": cost,
+            "cached": llm_agent.context['cache_hit'] and attempt == 0,
+            "result_cached": page is not None,
+            "speculation": speculation,
+            "page": page
+        }
+        if page is None and not (streaming and is_select(sql)):
+            answer['page'] = yield Blocking("work", store_page, result, sql, profile, 0, page_size, schema.tables)
+        return answer
+
+    raise Exception("Maximum refinement attempts reached")
+
+@app.route('/query/batch', methods=['POST'])
+def handle_batch():
+    # Many questions against one schema load: identical questions are answered once, the rest fan out over
+    # worker threads (Gemini calls gated by llm_limiter, SQL over pooled connections). One NDJSON line is
+    # streamed per item as it finishes, then a summary line.
+    data = request.get_json(silent=True) or {}
+    questions = data.get('queries') or []
+    if not isinstance(questions, list) or not questions:
+        return jsonify({"status": "error", "message": "No queries provided"}), 400
+    if len(questions) > BATCH_MAX_QUERIES:
+        return jsonify({"status": "error", "message": f"At most {BATCH_MAX_QUERIES} queries per batch"}), 400
+
+    profile = data.get('profile') or db_manager.profile
+    page_size = min(int(data.get('page_size', QUERY_PAGE_SIZE)), MAX_RESULT_ROWS)
+    concurrency = max(1, min(int(data.get('concurrency', BATCH_CONCURRENCY)), BATCH_CONCURRENCY))
+    success, schema = db_manager.get_schema(profile=profile)
+    if not success:
+        return jsonify({"status": "error", "message": schema}), 500
+    schema_index(schema)
+
+    groups = {}
+    for index, question in enumerate(questions):
+        groups.setdefault(normalize_question(str(question)), []).append(index)
+
+    def run_item(question, queued):
+        started = time.perf_counter()
+        llm_agent = StatefulSQLAgent(model, sql_cache, llm_limiter, prefix_cache)
+        llm_agent.log_state("INPUT", f"Received query: {question}")
+        try:
+            answer = answer_query(llm_agent, question, schema, profile, page_size)
+            envelope = {"status": "success", "sql": answer['sql'], "cost": answer['cost'],
+                        "cached": answer['cached'], "result_cached": answer['result_cached']}
+        except Exception as e:
+            llm_agent.log_state("STOP", f"Process failed: {str(e)}")
+            answer, envelope = {"page": None}, {"status": "error", "message": str(e)}
+        finally:
+            trace_buffer.add(llm_agent.trace)
+        envelope['timing'] = {
+            "queued_ms": round((started - queued) * 1000, 1),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        return envelope, answer['page']
+
+    def generate():
+        batch_started = time.perf_counter()
+        yield app.json.dumps({"type": "batch", "items": len(questions), "unique": len(groups)}) + "\n"
+        executor = ThreadPoolExecutor(min(concurrency, len(groups)), thread_name_prefix="query-batch")
+        counts = {"success": 0, "error": 0}
+        try:
+            futures = {
+                executor.submit(run_item, str(questions[indices[0]]), time.perf_counter()): indices
+                for indices in groups.values()
+            }
+            for future in as_completed(futures):
+                envelope, page = future.result()
+                for position, index in enumerate(futures[future]):
+                    counts[envelope['status']] += 1
+                    item = {"type": "item", "index": index, "query": questions[index], **envelope,
+                            "deduplicated": position > 0}
+                    yield (page_body(item, page) if page is not None else app.json.dumps(item)) + "\n"
+        finally:
+            # A client that disconnects mid-batch leaves nothing queued behind it
+            executor.shutdown(wait=False, cancel_futures=True)
+        yield app.json.dumps({
+            "type": "summary",
+            **counts,
+            "elapsed_ms": round((time.perf_counter() - batch_started) * 1000, 1)
+        }) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def cost_steps(llm_agent, sql, schema, profile):
+    # Returns (sql, cost, error); an EXPLAIN error goes back through refine_sql like an execution error
+    cost, error = yield Blocking("db", db_manager.explain, sql, profile)
+    if error:
+        return sql, None, error
+    cost.update(budget=QUERY_ROW_BUDGET, action="ok")
+    if not QUERY_ROW_BUDGET or cost['rows_examined'] <= QUERY_ROW_BUDGET:
+        return sql, cost, None
+
+    if is_limitable(sql, cost):
+        # The LIMIT pushed down for paging/streaming stops this scan early. Not when a full scan filters most rows
+        # away: it can read the whole table before LIMIT rows match.
+        cost['action'] = "limited"
+        llm_agent.log_state("OBSERVATION", f"Over row budget, relying on LIMIT: {cost['rows_examined']} rows")
+        return sql, cost, None
+
+    try:
+        rewritten = yield from llm_agent.optimize_sql_steps(cost, schema)
+    except Exception as e:
+        llm_agent.log_state("OBSERVATION", f"Rewrite failed: {e}")
+        rewritten = None
+    if rewritten is not None:
+        new_cost, error = yield Blocking("db", db_manager.explain, rewritten, profile)
+        if not error and new_cost['rows_examined'] <= QUERY_ROW_BUDGET:
+            new_cost.update(budget=QUERY_ROW_BUDGET, action="rewritten", original_rows_examined=cost['rows_examined'])
+            return rewritten, new_cost, None
+
+    raise Exception(
+        f"Query rejected: EXPLAIN estimates {cost['rows_examined']} rows examined, over the budget of {QUERY_ROW_BUDGET}"
+    )
+
+def page_result(result, sql, profile, offset, page_size):
+    if not isinstance(result, list) or not is_select(sql) or len(result) <= page_size:
+        return result, None
+    next_offset = offset + page_size
+    if next_offset >= MAX_RESULT_ROWS:
+        return result[:page_size], None
+    return result[:page_size], page_tokens.encode(sql, profile, next_offset, page_size)
+
+def store_page(result, sql, profile, offset, page_size, known_tables=None):
+    result, next_page = page_result(result, sql, profile, offset, page_size)
+    with span("serialize"):
+        payload = app.json.dumps(result)
+    if not is_select(sql):
+        return CachedResult(profile, payload, next_page)
+    tables = referenced_tables(sql, known_tables) if known_tables else sql_identifiers(sql)
+    return result_cache.put(profile, sql, page_size, offset, payload, next_page, tables)
+
+def page_body(envelope, page):
+    # Rows are spliced in already serialized, so result cache hits skip JSON encoding
+    envelope['next_page'] = page.next_page
+    return app.json.dumps(envelope)[:-1] + ',"result":' + page.payload + "}"
+
+def page_response(envelope, page):
+    return Response(page_body(envelope, page), mimetype="application/json")
+
+def row_stream(sql, profile, output_format, meta):
+    # (mimetype, chunks) of a streamed result. No connection is taken until the first chunk is pulled.
+    batches = db_manager.stream_query(sql, profile, STREAM_BATCH_SIZE, MAX_RESULT_ROWS)
+    if output_format == "arrow":
+        return "application/vnd.apache.arrow.stream", arrow_stream(batches, meta)
+    return "application/x-ndjson", ndjson_stream(batches, meta)
+
+def unstreamable(output_format, meta):
+    # Body for a 406, or None; checked before any streaming response starts, since its 200 goes out first
+    if output_format == "arrow" and not arrow_available():
+        return {"status": "error", "message": "Arrow output needs pyarrow on the server; use format=ndjson", **meta}
+    return None
+
+def stream_rows(sql, profile, output_format, meta):
+    error = unstreamable(output_format, meta)
+    if error is not None:
+        return jsonify(error), 406
+    mimetype, chunks = row_stream(sql, profile, output_format, meta)
+    return Response(stream_with_context(chunks), mimetype=mimetype)
+
+@app.route('/query/page', methods=['GET','POST'])
+def query_page():
+    data = request.get_json(silent=True) or {}
+    token = data.get('page_token') or request.args.get('page_token')
+    if not token:
+        return jsonify({"status": "error", "message": "No page token provided"}), 400
+    try:
+        page = page_tokens.decode(token)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    cached = result_cache.get(page['profile'], page['sql'], page['page_size'], page['offset'])
+    result_cached = cached is not None
+    if cached is None:
+        result, error = db_manager.execute_query(
+            page['sql'], page['profile'], limit=page['page_size'] + 1, offset=page['offset']
+        )
+        if error:
+            return jsonify({"status": "error", "message": error}), 500
+        cached = store_page(result, page['sql'], page['profile'], page['offset'], page['page_size'])
+    return page_response({"status": "success", "result_cached": result_cached}, cached)
+
+@app.route('/traces', methods=['GET'])
+def traces():
+    limit = request.args.get('limit', type=int)
+    return jsonify({"traces": trace_buffer.recent(limit)})
 
 @app.route('/upload', methods=['GET','POST'])
 def upload_csv():
+    from column_profile import profile_frame
+    from csv_ingest import Base64Reader, memory_report, read_csv_compact
+
     try:
-        data = request.get_json()
-        user_id = data.get('user_id')
-        csv_base64 = data.get('csv_data')
-        
-        if not csv_base64:
-            return jsonify({"error": "No CSV data provided"}), 400
-        
-        csv_bytes = base64.b64decode(csv_base64)
-        df = pd.read_csv(BytesIO(csv_bytes))
-        user_data[user_id] = df
+        # Preferred: multipart/form-data with a "file" part, parsed straight from the upload stream
+        upload = request.files.get('file')
+        if upload is not None:
+            user_id = request.form.get('user_id')
+            arrow = request.form.get('arrow', str(CSV_ARROW_DTYPES)).lower() in ("1", "true", "yes")
+            source = upload.stream
+        else:
+            data = request.get_json()
+            user_id = data.get('user_id')
+            csv_base64 = data.get('csv_data')
+            arrow = str(data.get('arrow', CSV_ARROW_DTYPES)).lower() in ("1", "true", "yes")
+            if not csv_base64:
+                return jsonify({"error": "No CSV data provided"}), 400
+            source = BufferedReader(Base64Reader(csv_base64))
+
+        df = read_csv_compact(source, CSV_CHUNK_SIZE, CSV_CATEGORY_RATIO, arrow)
+        profile = profile_frame(df)
+        user_data.put(user_id, df, profile)
         
-        return jsonify({"user_id": user_id, "columns": df.columns.tolist()})
+        return jsonify({"user_id": user_id, "columns": df.columns.tolist(), "memory": memory_report(df), "profile": profile})
+    except QuotaExceeded as e:
+        return jsonify({"error": str(e)}), 413
     except Exception as e:
         logging.error(f"Error processing CSV: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/upload/load', methods=['POST'])
+def load_upload():
+    # Writes a user's uploaded CSV into a MySQL table: the stored DataFrame is reused, no re-parsing.
+    # "columns" optionally renames CSV columns to table columns; "create" makes the table from the dtypes;
+    # "atomic" loads everything in one transaction instead of committing every batch.
+    data = request.get_json(silent=True) or {}
+    user_id, table = data.get('user_id'), data.get('table')
+    if not user_id or not table:
+        return jsonify({"status": "error", "message": "user_id and table are required"}), 400
+    df = user_data.get(user_id)
+    if df is None:
+        return jsonify({"status": "error", "message": "No data found for user"}), 404
+
+    profile = data.get('profile') or db_manager.profile
+    create = bool(data.get('create'))
+    mapping = data.get('columns') or {}
+    missing = [column for column in mapping if column not in df.columns]
+    if missing:
+        return jsonify({"status": "error", "message": f"Columns not in the upload: {missing}"}), 400
+    df = df[list(mapping)].rename(columns=mapping) if mapping else df
+    if not create:
+        success, schema = db_manager.get_schema(profile=profile)
+        if not success:
+            return jsonify({"status": "error", "message": schema}), 500
+        known = schema.column_names().get(table)
+        if known is None:
+            return jsonify({"status": "error", "message": f"Unknown table: {table}"}), 400
+        unknown = [column for column in df.columns if column not in known]
+        if unknown:
+            return jsonify({"status": "error", "message": f"Columns not in {table}: {unknown}"}), 400
+
+    batch_size = max(1, min(int(data.get('batch_size', BULK_BATCH_SIZE)), 100000))
+    try:
+        report = db_manager.load_frame(table, df, profile, create, bool(data.get('atomic')), batch_size)
+    except BulkWriteError as e:
+        return jsonify({"status": "error", "message": str(e), **e.report}), 500
+    except mysql.connector.Error as e:
+        return jsonify({"status": "error", "message": f"MySQL Error: {e}"}), 500
+    rate = report['rows'] / (report['elapsed_ms'] / 1000) if report['elapsed_ms'] else None
+    return jsonify({"status": "success", "table": table, **report, "rows_per_second": rate})
+
+def chart_options(data):
+    # Output negotiation for /visualize: "format" (one or a list) or else the Accept header picks the formats
+    # the client can use, and the cheapest of them is rendered. Formats named in Accept are sent as raw bytes.
+    requested = data.get('format') or []
+    if isinstance(requested, str):
+        requested = requested.split(",")
+    formats = {CHART_FORMAT_ALIASES.get(name.strip().lower(), name.strip().lower()) for name in requested}
+    unknown = formats.difference(CHART_FORMATS)
+    if unknown:
+        raise ValueError(f"Unsupported chart format(s): {sorted(unknown)}; expected {list(CHART_FORMATS)}")
+
+    accepted = {
+        fmt for fmt, media_type in CHART_MEDIA_TYPES.items()
+        if any(value == media_type and quality > 0 for value, quality in request.accept_mimetypes)
+    }
+    binary = data.get('encoding') == 'binary' or (not formats and bool(accepted))
+    fmt = next(fmt for fmt in CHART_FORMATS if fmt in (formats or accepted or {"png"}))
+
+    def dimension(name, default, low, high):
+        try:
+            return min(max(int(data.get(name, default)), low), high)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{name}' must be an integer")
+
+    return {
+        "format": fmt,
+        "binary": binary,
+        "width": dimension('width', 800, 16, MAX_CHART_PIXELS),
+        "height": dimension('height', 600, 16, MAX_CHART_PIXELS),
+        "dpi": dimension('dpi', 100, 36, 600)
+    }
+
 @app.route('/visualize', methods=['GET','POST'])
 def visualize():
     try:
@@ -327,24 +1417,115 @@ def visualize():
         user_id = data.get('user_id')
         query = data.get('query')
 
-        if user_id not in user_data:
+        df = user_data.get(user_id)
+        if df is None:
             return jsonify({"error": "No data uploaded for this user"}), 400
         
-        df = user_data[user_id]
-        visualizer = AIVisualizer(df)
-        image_base64 = visualizer.generate_visualization(query)
+        try:
+            options = chart_options(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        visualizer = AIVisualizer(df, user_data.path(user_id), user_data.fingerprint(user_id), user_data.get_profile(user_id))
+        image = visualizer.generate_visualization(
+            query, options["format"], options["width"], options["height"], options["dpi"]
+        )
         
-        if image_base64:
-            return jsonify({"image": image_base64, "query": query})
-        else:
+        if not image:
             return jsonify({"error": "Failed to generate visualization"}), 500
+        return chart_response(image, options, {"query": query, "path": visualizer.path})
     except Exception as e:
         logging.error(f"Error generating visualization: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def chart_response(image, options, meta):
+    if options["binary"]:
+        return Response(image, mimetype=CHART_MEDIA_TYPES[options["format"]], headers={
+            "X-Chart-Path": meta.get("path") or "",
+            "Vary": "Accept"
+        })
+
+    body = {**meta, "format": options["format"]}
+    if options["format"] == "vega-lite":
+        body["spec"] = json.loads(image)
+    elif options["format"] == "svg":
+        body["image"] = image.decode("utf-8")
+    else:
+        body["image"] = base64.b64encode(image).decode("utf-8")
+    return jsonify(body)
+
+@app.route('/query/visualize', methods=['POST'])
+def visualize_query():
+    # Chart the answer to a natural-language question straight from MySQL: the SQL is generated and validated
+    # as for /query, then the chart spec is compiled into aggregate SQL over it (see chart_sql.py).
+    # "chart" optionally describes the chart separately from the question; output options are as for /visualize.
+    data = request.get_json(silent=True) or {}
+    if not data.get('query'):
+        return jsonify({"status": "error", "message": "No query provided"}), 400
+    try:
+        options = chart_options(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    llm_agent = StatefulSQLAgent(model, sql_cache, prefixes=prefix_cache)
+    llm_agent.log_state("START")
+    try:
+        llm_agent.log_state("INPUT", f"Received chart query: {data['query']}")
+        profile = data.get('profile') or db_manager.profile
+        success, schema = db_manager.get_schema(profile=profile)
+        if not success:
+            raise Exception(schema)
+
+        sql, columns = describe_query(llm_agent, data['query'], schema, profile)
+        visualizer = QueryVisualizer(sql, columns, profile)
+        image = visualizer.generate_visualization(
+            data.get('chart') or data['query'], options["format"], options["width"], options["height"], options["dpi"]
+        )
+        if not image:
+            raise Exception(f"Failed to generate visualization: {visualizer.state}")
+        llm_agent.log_state("STOP", "Process completed successfully")
+        return chart_response(image, options, {
+            "status": "success",
+            "query": data['query'],
+            "sql": sql,
+            "path": visualizer.path,
+            "cached": llm_agent.context['cache_hit']
+        })
+    except Exception as e:
+        llm_agent.log_state("STOP", f"Process failed: {str(e)}")
+        return jsonify({"status": "error", "message": str(e), "states": llm_agent.states}), 500
+    finally:
+        trace_buffer.add(llm_agent.trace)
+
+def describe_query(llm_agent, question, schema, profile):
+    # Generated SQL and its result columns, refined like answer_query but never executed for rows
+    success, sql = llm_agent.generate_initial_sql(question, schema)
+    if not success:
+        raise Exception(sql)
+    for attempt in range(3):
+        sql, error = llm_agent.validate_sql(sql, schema)
+        if not error and not is_select(sql):
+            raise Exception("Only SELECT queries can be charted")
+        if not error:
+            columns, error = db_manager.result_columns(sql, profile)
+        if not error:
+            sql_cache.put(llm_agent.cache_question(question), schema.checksum, sql)
+            return sql, columns
+        success, sql = llm_agent.refine_sql(error, schema)
+        if not success:
+            raise Exception(sql)
+    raise Exception("Maximum refinement attempts reached")
+
 @app.route('/',methods=['GET'])
 def hello():
     return 'Agent\'s Backend is Running Successfully'
 
+def load_chart_stack():
+    # Everything /upload and /visualize import lazily; call before forking workers to share it copy-on-write
+    import chart_render, chart_sql, chart_vega, column_profile, csv_ingest  # noqa: F401
+
+if PRELOAD_CHARTS:
+    load_chart_stack()
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
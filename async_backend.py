@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from asgiref.wsgi import WsgiToAsgi
+
+import Backend
+from Backend import (SERVER_TIMING, page_body, query_agent, query_envelope, query_options, query_steps, row_stream,
+                     trace_buffer, unstreamable)
+from metrics import request_seconds, request_spans, response_bytes, server_timing
+from pipeline import run_async
+from result_stream import dumps
+
+# ASGI entry point: uvicorn async_backend:app
+# POST /query runs on the event loop, through the same pipeline steps as the Flask route (see pipeline.py);
+# every other route is served by the Flask app.
+
+# Blocking MySQL calls run here; the connection pools bound real DB concurrency. Other blocking work (prompt
+# building, speculation, summaries) uses the loop's default executor, so it never holds a DB thread.
+db_executor = ThreadPoolExecutor(max_workers=int(os.getenv("ASYNC_DB_THREADS", 32)))
+executors = {"db": db_executor}
+flask_app = WsgiToAsgi(Backend.app)
+
+
+async def in_executor(func, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(db_executor, partial(func, *args, **kwargs))
+
+
+async def run_query(data, started):
+    # Returns (status, JSON body) or, for a streamed result, (200, (mimetype, chunks))
+    try:
+        options = query_options(data)
+    except ValueError as e:
+        return 400, dumps({"status": "error", "message": str(e)})
+    llm_agent = query_agent(data)
+    try:
+        answer, meta = await run_async(query_steps(llm_agent, options, started), executors)
+        if answer['page'] is None:
+            meta = {**meta, "states": llm_agent.states}
+            error = unstreamable(options['format'], meta)
+            if error is not None:
+                return 406, dumps(error)
+            return 200, row_stream(answer['sql'], options['profile'], options['format'], meta)
+        return 200, page_body(query_envelope(llm_agent, answer, meta), answer['page'])
+    except Exception as e:
+        llm_agent.log_state("STOP", f"Process failed: {str(e)}")
+        return 500, dumps({
+            "status": "error",
+            "message": str(e),
+            "states": llm_agent.states
+        })
+    finally:
+        trace_buffer.add(llm_agent.trace)
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+def response_headers(content_type, timing):
+    headers = [(b"content-type", content_type.encode("ascii")), (b"access-control-allow-origin", b"*")]
+    if timing is not None:
+        headers.append((b"server-timing", timing.encode("ascii")))
+    return headers
+
+
+async def send_json(send, status, body, timing=None):
+    body = body.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": response_headers("application/json", timing) + [
+            (b"content-length", str(len(body)).encode("ascii"))
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_stream(send, mimetype, chunks, timing=None):
+    # Each chunk is pulled on db_executor: pulling it reads the next batch from the unbuffered cursor
+    await send({"type": "http.response.start", "status": 200, "headers": response_headers(mimetype, timing)})
+    try:
+        while True:
+            chunk = await in_executor(next, chunks, None)
+            if chunk is None:
+                break
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        # Closing drains and returns the connection, which can block as well
+        await in_executor(chunks.close)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            db_executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def handle_query(scope, receive, send):
+    # Same request metrics and Server-Timing header as Backend.record_timing gives the Flask routes
+    started = time.perf_counter()
+    spans = request_spans.set([])
+    status, size, timing = 500, None, None
+    try:
+        try:
+            data = json.loads(await read_body(receive) or b"{}")
+        except ValueError as e:
+            status, body = 400, dumps({"status": "error", "message": f"Invalid JSON: {e}"})
+        else:
+            status, body = await run_query(data, started)
+        if SERVER_TIMING or any(name == b"x-server-timing" and value == b"1" for name, value in scope["headers"]):
+            # Streamed bodies are still being produced, so their breakdown stops at the first byte
+            timing = server_timing(request_spans.get() + [("total", time.perf_counter() - started)])
+        if isinstance(body, tuple):
+            await send_stream(send, *body, timing=timing)
+        else:
+            size = len(body.encode("utf-8"))
+            await send_json(send, status, body, timing)
+    finally:
+        request_seconds.observe(time.perf_counter() - started, endpoint="handle_query", method="POST", status=status)
+        if size is not None:
+            response_bytes.observe(size, endpoint="handle_query")
+        request_spans.reset(spans)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] == "http" and scope["path"] == "/query" and scope["method"] == "POST":
+        await handle_query(scope, receive, send)
+        return
+    await flask_app(scope, receive, send)
@@ -0,0 +1,75 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_intent import parse_chart_intent
+
+# Compares the rule-based chart spec parser with the Gemini path used by AIVisualizer.
+#   python benchmarks/bench_chart_intent.py            rule path only
+#   API_KEY=... python benchmarks/bench_chart_intent.py --llm 5
+
+COLUMNS = ["emp_id", "first_name", "last_name", "hire_date", "salary", "bonus", "dept_name", "Category", "Sales", "Age"]
+NUMERIC = ["emp_id", "salary", "bonus", "Sales", "Age"]
+QUERIES = [
+    "histogram of salary",
+    "Show me a bar chart of sales by category",
+    "scatter plot of age vs salary",
+    "box plot of bonus",
+    "pie chart of dept name",
+    "line graph of sales over time",
+    "correlation heatmap",
+    "how are salaries spread across departments?",
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench_rules(iterations):
+    samples, served = [], 0
+    for _ in range(iterations):
+        for query in QUERIES:
+            start = time.perf_counter()
+            spec = parse_chart_intent(query, COLUMNS, NUMERIC)
+            samples.append(time.perf_counter() - start)
+            served += spec is not None
+    return samples, served / (iterations * len(QUERIES))
+
+
+def bench_llm(iterations):
+    import pandas as pd
+    from Backend import AIVisualizer
+
+    visualizer = AIVisualizer(pd.DataFrame(columns=COLUMNS))
+    samples = []
+    for _ in range(iterations):
+        for query in QUERIES:
+            start = time.perf_counter()
+            visualizer.llm_spec(query)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(name, samples, extra=""):
+    print(f"{name:6} n={len(samples):6}  mean={statistics.mean(samples) * 1e6:12.1f}us  "
+          f"p50={percentile(samples, 50) * 1e6:12.1f}us  p99={percentile(samples, 99) * 1e6:12.1f}us  {extra}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--llm", type=int, default=0, help="iterations against Gemini (needs API_KEY)")
+    args = parser.parse_args()
+
+    rule_samples, coverage = bench_rules(args.iterations)
+    report("rules", rule_samples, f"served {coverage:.0%} of queries without the LLM")
+    if args.llm:
+        llm_samples = bench_llm(args.llm)
+        report("llm", llm_samples)
+        print(f"speedup (p50): {percentile(llm_samples, 50) / percentile(rule_samples, 50):,.0f}x")
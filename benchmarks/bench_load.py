@@ -0,0 +1,246 @@
+import argparse
+import base64
+import io
+import json
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Drives /upload, /visualize and /query under concurrent load with the fake LLM, so no Gemini key is needed.
+#   python benchmarks/bench_load.py --scenarios upload,visualize                          in-process, no MySQL
+#   python benchmarks/seed_database.py --user root --password ...                           once, for /query
+#   python benchmarks/bench_load.py --db-user root --db-password ... --concurrency 16       in-process, all scenarios
+#   python benchmarks/bench_load.py --url http://localhost:8000 --server-pid 1234           against a running server
+#   python benchmarks/bench_load.py --scenarios session --db-user root ...                  per-turn latency and tokens
+# Start a server for --url with LLM_BACKEND=fake LLM_FAKE_SCRIPT=benchmarks/fake_responses.json so it answers offline.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+QUESTIONS = [
+    "How many employees are there?",
+    "Average salary by department",
+    "Who are the highest paid employees?",
+    "Number of hires per year",
+    "Employees with a large bonus",
+    "List employees in IT",
+    "List all employees",
+]
+FOLLOW_UPS = [
+    "List employees in IT",
+    "now only those hired after 2015",
+    "sort them by salary",
+    "only the top 10",
+    "include their department name",
+    "now the same for Finance",
+]
+CHART_QUERIES = [
+    "histogram of salary",
+    "bar chart of dept_name",
+    "scatter plot of age vs salary",
+    "box plot of bonus",
+    "pie chart of category",
+    "correlation heatmap",
+    "how are salaries spread across the company?",
+    "compare headcount across departments",
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def synthetic_csv(rows, seed=0):
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "emp_id": np.arange(1, rows + 1),
+        "dept_name": rng.choice(["HR", "IT", "Finance", "Marketing", "Sales", "Legal"], rows),
+        "category": rng.choice(list("ABCDEFGH"), rows),
+        "age": rng.integers(21, 65, rows),
+        "salary": rng.lognormal(11, 0.35, rows).round(2),
+        "bonus": rng.uniform(0, 10000, rows).round(2),
+    })
+    return frame.to_csv(index=False).encode()
+
+
+class LocalClient:
+    # Flask test client per thread: the whole request path runs in this process, so RSS covers the server
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def post(self, path, body=None, files=None):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        if files:
+            response = client.post(path, data=files, content_type="multipart/form-data")
+        else:
+            response = client.post(path, json=body)
+        data = response.get_data()
+        return response.status_code, data
+
+
+class HttpClient:
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def post(self, path, body=None, files=None):
+        if files:
+            # The base64 JSON form of /upload, to avoid hand-encoding multipart
+            csv = files["file"][0].getvalue()
+            body = {"user_id": files["user_id"], "csv_data": base64.b64encode(csv).decode()}
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+def run(name, calls, concurrency):
+    def timed(call):
+        start = time.perf_counter()
+        try:
+            status, _ = call()
+            ok = status < 400
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(timed, calls))
+    wall = time.perf_counter() - started
+    latencies = [latency for latency, _ in results]
+    errors = sum(not ok for _, ok in results)
+    print(f"{name:10} n={len(results):6}  errors={errors:5}  {len(results) / wall:9.1f} req/s  "
+          f"mean={statistics.mean(latencies) * 1e3:9.1f}ms  p50={percentile(latencies, 50) * 1e3:9.1f}ms  "
+          f"p95={percentile(latencies, 95) * 1e3:9.1f}ms  p99={percentile(latencies, 99) * 1e3:9.1f}ms")
+
+
+def conversations(client, sessions, concurrency):
+    # Each session asks FOLLOW_UPS in order; turns are reported by position, since later ones carry history
+    def converse(index):
+        turns = []
+        for question in FOLLOW_UPS:
+            start = time.perf_counter()
+            status, body = client.post("/query", {"query": question, "session_id": f"bench-session-{index}",
+                                                  "page_size": 100})
+            usage = (json.loads(body).get("usage") or {}) if status < 400 else {}
+            turns.append((time.perf_counter() - start, usage))
+        return turns
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(converse, range(sessions)))
+    for turn in range(len(FOLLOW_UPS)):
+        latencies = [result[turn][0] for result in results]
+        usages = [result[turn][1] for result in results if result[turn][1]]
+        sent = [usage["prompt_tokens"] - usage["cached_tokens"] for usage in usages] or [0]
+        cached = [usage["cached_tokens"] for usage in usages] or [0]
+        print(f"turn {turn + 1:<5} n={len(latencies):6}  errors={len(latencies) - len(usages):5}  "
+              f"p50={percentile(latencies, 50) * 1e3:9.1f}ms  p95={percentile(latencies, 95) * 1e3:9.1f}ms  "
+              f"prompt tokens sent={statistics.mean(sent):8.0f}  cached={statistics.mean(cached):8.0f}")
+
+
+def peak_rss(server_pid=None):
+    if server_pid:
+        with open(f"/proc/{server_pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return f"server pid {server_pid}: {int(line.split()[1]) / 1024:,.1f} MiB"
+        return "unknown"
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return f"this process: {own:,.1f} MiB, largest render worker: {children:,.1f} MiB"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="benchmark a running server instead of the app in-process")
+    parser.add_argument("--server-pid", type=int, help="pid of the --url server, for its peak RSS")
+    parser.add_argument("--scenarios", default="upload,visualize,query")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--users", type=int, default=8, help="distinct uploaded datasets")
+    parser.add_argument("--rows", type=int, default=100000, help="rows per uploaded CSV")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per fake LLM call")
+    parser.add_argument("--cold", action="store_true", help="disable the SQL, result and chart caches")
+    parser.add_argument("--db-host", default="localhost")
+    parser.add_argument("--db-port", type=int, default=3306)
+    parser.add_argument("--db-user")
+    parser.add_argument("--db-password", default=os.getenv("MYSQL_PASSWORD", ""))
+    parser.add_argument("--db-name", default="symbi_bench")
+    args = parser.parse_args()
+    scenarios = args.scenarios.split(",")
+
+    if args.url:
+        client = HttpClient(args.url)
+    else:
+        # Must be set before Backend is imported: the model and caches are created at import time
+        os.environ.setdefault("LLM_BACKEND", "fake")
+        os.environ.setdefault("LLM_FAKE_SCRIPT", os.path.join(HERE, "fake_responses.json"))
+        os.environ["LLM_FAKE_LATENCY"] = str(args.llm_latency)
+        if args.cold:
+            for name in ("SQL_CACHE_SIZE", "RESULT_CACHE_MAX_BYTES", "CHART_SPEC_CACHE_SIZE", "CHART_IMAGE_CACHE_BYTES"):
+                os.environ[name] = "0"
+        import Backend
+
+        client = LocalClient(Backend.app)
+
+    print(f"concurrency={args.concurrency} requests={args.requests} llm_latency={args.llm_latency}s "
+          f"cold={args.cold} target={args.url or 'in-process'}")
+
+    if "upload" in scenarios or "visualize" in scenarios:
+        csv = synthetic_csv(args.rows)
+        print(f"synthetic CSV: {args.rows:,} rows, {len(csv) / 1024 ** 2:,.1f} MiB")
+        run("upload", [
+            (lambda i=i: client.post("/upload", files={"file": (io.BytesIO(csv), "bench.csv"), "user_id": f"bench-{i % args.users}"}))
+            for i in range(max(args.users, args.requests if "upload" in scenarios else 0))
+        ], args.concurrency)
+
+    if "visualize" in scenarios:
+        run("visualize", [
+            (lambda i=i: client.post("/visualize", {
+                "user_id": f"bench-{i % args.users}",
+                "query": CHART_QUERIES[i % len(CHART_QUERIES)]
+            }))
+            for i in range(args.requests)
+        ], args.concurrency)
+
+    database_scenarios = {"query", "session"} & set(scenarios)
+    if database_scenarios and not (args.db_user or args.url):
+        print(f"{','.join(sorted(database_scenarios))} skipped: pass --db-user (see seed_database.py)")
+    elif database_scenarios and args.db_user:
+        status, body = client.post("/connect", {
+            "host": args.db_host, "port": args.db_port, "user": args.db_user,
+            "password": args.db_password, "database": args.db_name
+        })
+        if status >= 400 or not json.loads(body).get("success"):
+            sys.exit(f"connect failed: {body[:200]!r}")
+
+    if "query" in scenarios and (args.db_user or args.url):
+        run("query", [
+            (lambda i=i: client.post("/query", {"query": QUESTIONS[i % len(QUESTIONS)], "page_size": 100}))
+            for i in range(args.requests)
+        ], args.concurrency)
+
+    if "session" in scenarios and (args.db_user or args.url):
+        conversations(client, max(1, args.requests // len(FOLLOW_UPS)), args.concurrency)
+
+    if not args.url and Backend.render_pool is not None:
+        # Render workers only show up in RUSAGE_CHILDREN once they have exited
+        Backend.render_pool.shutdown(wait=True)
+    print(f"peak RSS: {peak_rss(args.server_pid)}")
@@ -0,0 +1,161 @@
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Worker cold-start cost: import time and RSS of Backend with the chart stack lazy or preloaded, the price of the
+# first /visualize, and per-worker memory of a gunicorn server with and without preload_app.
+#   python benchmarks/bench_startup.py                    fresh interpreter per run, lazy vs PRELOAD_CHARTS=1
+#   python benchmarks/bench_startup.py --gunicorn 4       boot time and per-worker RSS/PSS/USS, preload on and off
+# PSS splits shared pages between the processes mapping them, so its sum is the server's real footprint.
+
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "seaborn", "pyarrow", "google.generativeai", "grpc"]
+
+
+def memory(pid="self"):
+    # MiB from /proc: rss, and pss/uss (private pages) where smaps_rollup exists
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                values["rss"] = int(line.split()[1]) / 1024
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in f if line.split()[-1:] == ["kB"]}
+        values["pss"] = fields.get("Pss", 0) / 1024
+        values["uss"] = (fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024
+    except (FileNotFoundError, ValueError):
+        pass
+    return values
+
+
+def sample_csv(rows=5000):
+    rng = random.Random(0)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["dept_name", "age", "salary"])
+    for _ in range(rows):
+        writer.writerow([rng.choice(["HR", "IT", "Sales"]), rng.randint(21, 65), round(rng.lognormvariate(11, 0.3), 2)])
+    return out.getvalue().encode()
+
+
+def probe(first_request):
+    # Runs in a fresh interpreter; prints one JSON line
+    started = time.perf_counter()
+    import Backend
+
+    report = {"import_s": time.perf_counter() - started, **memory(),
+              "loaded": [name for name in HEAVY_MODULES if name in sys.modules]}
+    if first_request:
+        client = Backend.app.test_client()
+        started = time.perf_counter()
+        client.post("/upload", data={"file": (io.BytesIO(sample_csv()), "probe.csv"), "user_id": "probe"},
+                    content_type="multipart/form-data")
+        report["first_upload_s"] = time.perf_counter() - started
+        started = time.perf_counter()
+        response = client.post("/visualize", json={"user_id": "probe", "query": "histogram of salary"})
+        report["first_visualize_s"] = time.perf_counter() - started
+        report["visualize_status"] = response.status_code
+        report["rss_after_visualize"] = memory()["rss"]
+    print(json.dumps(report))
+
+
+def probe_env(preload):
+    return {
+        **os.environ,
+        "LLM_BACKEND": "fake",
+        "RENDER_WORKERS": "0",
+        "PRELOAD_CHARTS": "1" if preload else "0",
+        "DATASET_DIR": tempfile.mkdtemp(prefix="bench_startup_"),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+
+
+def imports(runs, first_request):
+    for preload in (False, True):
+        reports = []
+        for _ in range(runs):
+            command = [sys.executable, os.path.abspath(__file__), "--probe"] + (["--first-request"] if first_request else [])
+            output = subprocess.run(command, cwd=ROOT, env=probe_env(preload), capture_output=True, text=True, check=True)
+            reports.append(json.loads(output.stdout.strip().splitlines()[-1]))
+        line = (f"{'preload' if preload else 'lazy':8} import p50={statistics.median(r['import_s'] for r in reports):6.2f}s  "
+                f"rss={statistics.median(r['rss'] for r in reports):7.1f} MiB")
+        if first_request:
+            line += (f"  first upload={statistics.median(r['first_upload_s'] for r in reports):6.2f}s"
+                     f"  first visualize={statistics.median(r['first_visualize_s'] for r in reports):6.2f}s"
+                     f"  rss after={statistics.median(r['rss_after_visualize'] for r in reports):7.1f} MiB")
+        print(line)
+        print(f"         loaded at import: {', '.join(reports[0]['loaded']) or 'none'}")
+
+
+def children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+def gunicorn(workers, port, preload, timeout=120):
+    env = {**probe_env(preload), "GUNICORN_PRELOAD": "1" if preload else "0"}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--workers", str(workers),
+         "--bind", f"127.0.0.1:{port}", "Backend:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            if time.perf_counter() - started > timeout or server.poll() is not None:
+                raise SystemExit("gunicorn did not come up")
+            if len(children(server.pid)) == workers:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                        break
+                except OSError:
+                    pass
+            time.sleep(0.05)
+        # Every worker has to finish importing before it counts as booted
+        time.sleep(1)
+        boot = time.perf_counter() - started
+        workers_memory = [memory(pid) for pid in children(server.pid)]
+        master = memory(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    total_pss = master.get("pss", 0) + sum(worker.get("pss", 0) for worker in workers_memory)
+    print(f"{'preload' if preload else 'no preload':10} boot={boot:5.1f}s  master rss={master['rss']:7.1f} MiB  "
+          f"worker rss={statistics.mean(w['rss'] for w in workers_memory):7.1f}  "
+          f"uss={statistics.mean(w.get('uss', 0) for w in workers_memory):7.1f}  "
+          f"pss={statistics.mean(w.get('pss', 0) for w in workers_memory):7.1f} MiB  total pss={total_pss:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode")
+    parser.add_argument("--first-request", action="store_true", help="also time the first /upload and /visualize")
+    parser.add_argument("--gunicorn", type=int, metavar="WORKERS", help="measure a gunicorn server instead")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        probe(args.first_request)
+    elif args.gunicorn:
+        for preload in (False, True):
+            gunicorn(args.gunicorn, args.port, preload)
+    else:
+        imports(args.runs, args.first_request)
@@ -0,0 +1,109 @@
+import argparse
+import os
+import random
+import re
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+
+# Loads the sql_new_database.sql schema into a scratch database and fills it with synthetic rows,
+# so bench_load.py has something realistic to query:
+#   python benchmarks/seed_database.py --user root --password ... --employees 2000000
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql_new_database.sql")
+FIRST_NAMES = ["Alice", "Bob", "Charlie", "Dana", "Eve", "Farhan", "Grace", "Hiro", "Ines", "Jamal", "Kavya", "Liam"]
+LAST_NAMES = ["Johnson", "Smith", "Brown", "Patel", "Garcia", "Kim", "Nguyen", "Okafor", "Rossi", "Silva", "Wang"]
+DEPARTMENTS = ["HR", "IT", "Finance", "Marketing", "Sales", "Legal", "Operations", "Research", "Support", "Design"]
+
+
+def create_statements():
+    with open(SCHEMA_FILE, encoding="utf-8") as f:
+        script = re.sub(r"--[^\n]*", "", f.read())
+    return [statement.strip() for statement in script.split(";")
+            if re.match(r"\s*create\s+table", statement, re.IGNORECASE)]
+
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def employees(count, departments, rng):
+    start = date(2000, 1, 1)
+    for emp_id in range(1, count + 1):
+        yield (
+            emp_id,
+            rng.choice(FIRST_NAMES),
+            rng.choice(LAST_NAMES),
+            f"employee{emp_id}@bench.example",
+            f"9{rng.randrange(10 ** 9):09d}",
+            start + timedelta(days=rng.randrange(9000)),
+            round(rng.lognormvariate(11, 0.35), 2),
+            rng.randint(1, departments)
+        )
+
+
+def salaries(count, rng):
+    for emp_id in range(1, count + 1):
+        yield emp_id, round(rng.lognormvariate(11, 0.35), 2), round(rng.uniform(0, 10000), 2)
+
+
+def load(cursor, connection, sql, rows, batch_size, label, total):
+    started, done = time.perf_counter(), 0
+    for batch in batches(rows, batch_size):
+        cursor.executemany(sql, batch)
+        connection.commit()
+        done += len(batch)
+        print(f"\r{label}: {done:,}/{total:,} rows ({done / (time.perf_counter() - started):,.0f} rows/s)", end="")
+    print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.getenv("MYSQL_PASSWORD", ""))
+    parser.add_argument("--database", default="symbi_bench")
+    parser.add_argument("--employees", type=int, default=1000000)
+    parser.add_argument("--departments", type=int, default=len(DEPARTMENTS))
+    parser.add_argument("--batch", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    connection = mysql.connector.connect(host=args.host, port=args.port, user=args.user, password=args.password)
+    cursor = connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+    cursor.execute(f"CREATE DATABASE `{args.database}`")
+    cursor.execute(f"USE `{args.database}`")
+    for statement in create_statements():
+        cursor.execute(statement)
+
+    # Bulk load: keys are checked once at the end instead of per row
+    cursor.execute("SET unique_checks = 0")
+    cursor.execute("SET foreign_key_checks = 0")
+    rng = random.Random(args.seed)
+    names = [DEPARTMENTS[i % len(DEPARTMENTS)] + ("" if i < len(DEPARTMENTS) else f" {i // len(DEPARTMENTS)}")
+             for i in range(args.departments)]
+    cursor.executemany("INSERT INTO departments (dept_id, dept_name) VALUES (%s, %s)",
+                       [(i + 1, name) for i, name in enumerate(names)])
+    load(cursor, connection,
+         "INSERT INTO employees (emp_id, first_name, last_name, email, phone, hire_date, salary, dept_id) "
+         "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+         employees(args.employees, args.departments, rng), args.batch, "employees", args.employees)
+    load(cursor, connection, "INSERT INTO salaries (emp_id, salary, bonus) VALUES (%s, %s, %s)",
+         salaries(args.employees, rng), args.batch, "salaries", args.employees)
+    cursor.execute("SET unique_checks = 1")
+    cursor.execute("SET foreign_key_checks = 1")
+    for table in ("departments", "employees", "salaries"):
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+    connection.close()
+    print(f"Seeded {args.database}: {args.departments} departments, {args.employees:,} employees and salaries")
@@ -0,0 +1,224 @@
+import re
+import time
+
+# Bulk writes on a single connection. Work is grouped into explicit transactions so a load costs one commit
+# (one redo log flush) per batch instead of per row:
+#   atomic=True    the whole job is one transaction; any failure rolls everything back
+#   atomic=False   every batch commits on its own; a failure rolls back only the failing batch
+# DDL (CREATE, ALTER, TRUNCATE, ...) commits implicitly in MySQL, so a script containing it is only atomic
+# from its last DDL statement onwards.
+
+TUPLE = r"\((?:[^()]|\([^()]*\))*\)"
+VALUES_ONLY = re.compile(rf"\s*{TUPLE}(?:\s*,\s*{TUPLE})*\s*", re.DOTALL)
+INSERT_HEAD = re.compile(
+    r"^\s*(insert\s+(?:ignore\s+)?into\s+[`\w.$]+\s*(?:\([^)]*\))?\s*values)\s*(.*)$", re.IGNORECASE | re.DOTALL
+)
+KEYWORDS = re.compile(r"\b(insert|ignore|into|values)\b", re.IGNORECASE)
+LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"", re.DOTALL)
+
+
+class BulkWriteError(Exception):
+    # Carries the progress report, so callers can tell what was committed before the failure
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+def quote_identifier(name):
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def split_statements(script):
+    # Splits on ; outside quotes, backticks and comments. Plain comments are dropped; /*! */ and /*+ */ are
+    # executable by MySQL and kept.
+    statements, current, quote = [], [], None
+    i, n = 0, len(script)
+    while i < n:
+        ch = script[i]
+        if quote:
+            current.append(ch)
+            if ch == "\\" and quote != "`" and i + 1 < n:
+                current.append(script[i + 1])
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in "'\"`":
+            quote = ch
+            current.append(ch)
+        elif ch == "#" or (script.startswith("--", i) and (i + 2 == n or script[i + 2].isspace())):
+            end = script.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        elif script.startswith("/*", i) and not script.startswith(("/*!", "/*+"), i):
+            end = script.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            current.append(" ")
+            continue
+        elif ch == ";":
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        else:
+            current.append(ch)
+        i += 1
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def coalesce_inserts(statements, batch_size):
+    # Consecutive INSERT ... VALUES into the same table and columns become one multi-row INSERT of up to
+    # batch_size rows. Anything else (ON DUPLICATE KEY, INSERT ... SELECT, other statements) is left as is.
+    merged, head, values, count = [], None, [], 0
+
+    def flush():
+        if values:
+            merged.append(f"{head} {', '.join(values)}")
+
+    for statement in statements:
+        match = INSERT_HEAD.match(statement)
+        masked = LITERAL.sub("''", match.group(2)) if match else ""
+        if not match or not VALUES_ONLY.fullmatch(masked):
+            flush()
+            head, values, count = None, [], 0
+            merged.append(statement)
+            continue
+        key = KEYWORDS.sub(lambda keyword: keyword.group(0).upper(), " ".join(match.group(1).split()))
+        rows = len(re.findall(TUPLE, masked))
+        if key != head or count + rows > batch_size:
+            flush()
+            head, values, count = key, [], 0
+        values.append(match.group(2).strip())
+        count += rows
+    flush()
+    return merged
+
+
+def column_type(values):
+    kind = values.dtype.kind
+    if kind == "b":
+        return "BOOLEAN"
+    if kind in "iu":
+        return "BIGINT"
+    if kind == "f":
+        return "DOUBLE"
+    if kind == "M":
+        return "DATETIME"
+    lengths = values.dropna().astype(str).str.len()
+    return "VARCHAR(255)" if lengths.empty or lengths.max() <= 255 else "TEXT"
+
+
+def create_table_sql(table, df):
+    columns = ", ".join(f"{quote_identifier(name)} {column_type(df[name])}" for name in df.columns)
+    return f"CREATE TABLE IF NOT EXISTS {quote_identifier(table)} ({columns})"
+
+
+def frame_batches(df, batch_size):
+    # Rows as plain Python values: NaN/NaT become NULL, numpy scalars and Timestamps become int/float/datetime
+    for start in range(0, len(df), batch_size):
+        chunk = df.iloc[start:start + batch_size]
+        columns = []
+        for name in chunk.columns:
+            values = chunk[name]
+            missing = values.isna().tolist()
+            items = values.dt.to_pydatetime().tolist() if values.dtype.kind == "M" else values.tolist()
+            columns.append([None if null else item for item, null in zip(items, missing)])
+        yield list(zip(*columns))
+
+
+class BulkWriter:
+    def __init__(self, connection, batch_size=1000, atomic=True):
+        self.connection = connection
+        self.batch_size = max(1, batch_size)
+        self.atomic = atomic
+        self.report = {"statements": 0, "rows": 0, "batches": 0, "committed_batches": 0, "elapsed_ms": 0.0}
+
+    def begin(self):
+        # A connection without autocommit may hold an implicit transaction from an earlier read
+        if self.connection.in_transaction:
+            self.connection.commit()
+        self.connection.start_transaction()
+
+    def commit(self, batches):
+        self.connection.commit()
+        self.report['committed_batches'] += batches
+
+    def run(self, units, apply):
+        # apply(cursor, unit) -> rows affected; each unit is one batch
+        started = time.perf_counter()
+        cursor = self.connection.cursor()
+        pending = 0
+        try:
+            if self.atomic:
+                self.begin()
+            for unit in units:
+                if not self.atomic:
+                    self.begin()
+                self.report['rows'] += max(apply(cursor, unit), 0)
+                self.report['batches'] += 1
+                pending += 1
+                if not self.atomic:
+                    self.commit(pending)
+                    pending = 0
+            if self.atomic:
+                self.commit(pending)
+        except Exception as e:
+            self.connection.rollback()
+            if self.atomic:
+                self.report['rows'] = 0
+            self.report['error'] = str(e)
+            raise BulkWriteError(f"Bulk write failed after {self.report['committed_batches']} committed batches: {e}",
+                                 self.report) from e
+        finally:
+            cursor.close()
+            self.report['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return self.report
+
+    def run_script(self, script):
+        statements = coalesce_inserts(split_statements(script), self.batch_size)
+
+        def apply(cursor, statement):
+            cursor.execute(statement)
+            self.report['statements'] += 1
+            if cursor.with_rows:
+                self.report['result'] = cursor.fetchall()
+                return 0
+            return cursor.rowcount
+
+        return self.run(statements, apply)
+
+    def insert_many(self, sql, rows):
+        # mysql.connector rewrites executemany() of an INSERT ... VALUES into one multi-row INSERT per call
+        def batches():
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        return self.insert_batches(sql, batches())
+
+    def insert_batches(self, sql, batches):
+        def apply(cursor, batch):
+            cursor.executemany(sql, batch)
+            self.report['statements'] += 1
+            return cursor.rowcount
+
+        return self.run(batches, apply)
+
+    def load_frame(self, table, df, create=False):
+        if create:
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute(create_table_sql(table, df))
+            finally:
+                cursor.close()
+        columns = ", ".join(quote_identifier(name) for name in df.columns)
+        placeholders = ", ".join(["%s"] * len(df.columns))
+        sql = f"INSERT INTO {quote_identifier(table)} ({columns}) VALUES ({placeholders})"
+        return self.insert_batches(sql, frame_batches(df, self.batch_size))
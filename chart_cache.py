@@ -0,0 +1,64 @@
+import threading
+from collections import OrderedDict
+
+from sql_cache import normalize_question
+
+
+class ChartCache:
+    # Chart specs keyed on dataset fingerprint + normalized query, rendered images on fingerprint + spec
+    def __init__(self, max_specs=5000, max_image_bytes=128 * 1024 * 1024):
+        self.max_specs = max_specs
+        self.max_image_bytes = max_image_bytes
+        self.specs = OrderedDict()
+        self.images = OrderedDict()
+        self.image_bytes = 0
+        self.counters = {"spec_hits": 0, "spec_misses": 0, "image_hits": 0, "image_misses": 0}
+        self.lock = threading.Lock()
+
+    def _lookup(self, entries, key, kind):
+        with self.lock:
+            value = entries.get(key)
+            if value is None:
+                self.counters[f"{kind}_misses"] += 1
+                return None
+            entries.move_to_end(key)
+            self.counters[f"{kind}_hits"] += 1
+            return value
+
+    def get_spec(self, fingerprint, query):
+        return self._lookup(self.specs, (fingerprint, normalize_question(query)), "spec")
+
+    def put_spec(self, fingerprint, query, spec):
+        with self.lock:
+            self.specs[(fingerprint, normalize_question(query))] = spec
+            while len(self.specs) > self.max_specs:
+                self.specs.popitem(last=False)
+
+    def image_key(self, fingerprint, vis_type, columns, variant):
+        return (fingerprint, vis_type, tuple(columns), variant)
+
+    def get_image(self, fingerprint, vis_type, columns, variant="png"):
+        return self._lookup(self.images, self.image_key(fingerprint, vis_type, columns, variant), "image")
+
+    def put_image(self, fingerprint, vis_type, columns, image, variant="png"):
+        if len(image) > self.max_image_bytes:
+            return
+        key = self.image_key(fingerprint, vis_type, columns, variant)
+        with self.lock:
+            previous = self.images.pop(key, None)
+            if previous is not None:
+                self.image_bytes -= len(previous)
+            self.images[key] = image
+            self.image_bytes += len(image)
+            while self.image_bytes > self.max_image_bytes:
+                _, evicted = self.images.popitem(last=False)
+                self.image_bytes -= len(evicted)
+
+    def stats(self):
+        with self.lock:
+            return {
+                **self.counters,
+                "specs": len(self.specs),
+                "images": len(self.images),
+                "image_bytes": self.image_bytes
+            }
@@ -0,0 +1,90 @@
+import re
+from difflib import SequenceMatcher
+
+# Phrases that name a chart type outright; the rule path only answers when exactly one type matches
+CHART_KEYWORDS = {
+    "histogram": ("histogram", "distribution of", "frequency distribution"),
+    "scatter plot": ("scatter", "scatterplot", "vs", "versus", "against"),
+    "box plot": ("box plot", "boxplot", "box-plot", "box and whisker", "whisker"),
+    "bar chart": ("bar chart", "bar graph", "bar plot", "barplot", "bars"),
+    "line graph": ("line graph", "line chart", "line plot", "trend", "over time"),
+    "pie chart": ("pie", "donut", "share of", "proportion of"),
+    "heatmap": ("heatmap", "heat map", "correlation matrix", "correlations")
+}
+MIN_COLUMNS = {"scatter plot": 2, "heatmap": 0}
+# Whole words or phrases only, so "recipient" does not mean a pie chart
+CHART_PATTERNS = {
+    vis_type: [re.compile(rf"\b{re.escape(phrase)}\b") for phrase in phrases]
+    for vis_type, phrases in CHART_KEYWORDS.items()
+}
+
+
+def normalize(text):
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower().replace("_", " ")))
+
+
+def match_chart_types(query):
+    text = query.lower()
+    return [vis_type for vis_type, patterns in CHART_PATTERNS.items()
+            if any(pattern.search(text) for pattern in patterns)]
+
+
+def match_columns(query, columns, threshold=0.85):
+    # Exact mentions first; otherwise fuzzy-match each column against same-length word windows of the query.
+    # Positions are word indices in both passes.
+    words = normalize(query).split()
+    found, fuzzy, claimed = [], [], set()
+    for column in columns:
+        name = normalize(str(column)).split()
+        if not name:
+            continue
+        position = next((i for i in range(len(words) - len(name) + 1) if words[i:i + len(name)] == name), -1)
+        if position >= 0:
+            found.append((position, 1.0, column))
+            claimed.update(range(position, position + len(name)))
+        else:
+            fuzzy.append((column, " ".join(name), len(name)))
+
+    for column, name, size in fuzzy:
+        best, best_position = 0.0, -1
+        matcher = SequenceMatcher(None, "", name)
+        for i in range(len(words) - size + 1):
+            # A word claimed by an exact match should not also count as a fuzzy match for another column
+            if claimed.intersection(range(i, i + size)):
+                continue
+            matcher.set_seq1(" ".join(words[i:i + size]))
+            # Cheap upper bounds first; the full ratio is only computed for plausible windows
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+            score = matcher.ratio()
+            if score > best:
+                best, best_position = score, i
+        if best >= threshold:
+            found.append((best_position, best, column))
+
+    # Two fuzzy matches starting at the same word: the better one wins
+    found.sort(key=lambda item: (item[0], -item[1]))
+    matched, positions = [], set()
+    for position, _, column in found:
+        if position not in positions:
+            matched.append(column)
+            positions.add(position)
+    return matched
+
+
+def parse_chart_intent(query, columns, numeric_columns=None):
+    vis_types = match_chart_types(query)
+    if len(vis_types) != 1:
+        return None
+    vis_type = vis_types[0]
+    matched = match_columns(query, columns)
+    if vis_type == "heatmap" and not matched:
+        matched = list(numeric_columns if numeric_columns is not None else columns)
+    if len(matched) < max(MIN_COLUMNS.get(vis_type, 1), 1):
+        return None
+    if vis_type in ("bar chart", "pie chart"):
+        # "sales by category": the grouping column goes first, as create_plot counts columns[0]
+        text = f" {normalize(query)} "
+        grouped = [column for column in matched if f" by {normalize(str(column))} " in text]
+        matched = grouped + [column for column in matched if column not in grouped]
+    return {"visualization": vis_type, "columns": matched}
@@ -0,0 +1,101 @@
+import os
+from io import BytesIO
+
+import pandas as pd
+import pyarrow.feather as feather
+import seaborn as sns
+from matplotlib import rc_context
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from column_profile import profile_box, profile_correlation, profile_counts, profile_histogram
+from plot_reduction import (MAX_BAR_CATEGORIES, MAX_PIE_CATEGORIES, PLOT_POINT_THRESHOLD, box_stats, category_counts,
+                            correlation, downsample_frame, histogram_bins, stratified_sample)
+
+# Drawing with matplotlib/seaborn. Limits and data reduction shared with chart_vega and chart_sql live in
+# plot_reduction, so those paths never import the plotting stack.
+SCATTER_REDUCTION = os.getenv("SCATTER_REDUCTION", "hexbin")  # or "sample"
+
+# Formats rendered by matplotlib; "vega-lite" specs are built in chart_vega without drawing anything
+IMAGE_FORMATS = ("png", "svg")
+
+
+def needed_columns(vis_type, columns, profile):
+    # Charts answered entirely from the upload-time profile need no data at all
+    if vis_type == "heatmap":
+        return [] if profile and profile_correlation(profile) is not None else None
+    if vis_type in ("bar chart", "pie chart") and profile:
+        limit = MAX_BAR_CATEGORIES if vis_type == "bar chart" else MAX_PIE_CATEGORIES
+        if profile_counts(profile, columns[0], limit) is not None:
+            return []
+    if vis_type == "histogram" and profile and profile_histogram(profile, columns[0]) is not None:
+        return []
+    if vis_type == "box plot" and profile and profile_box(profile, columns[0]) is not None:
+        return []
+    return list(dict.fromkeys(columns))
+
+
+def draw(ax, df, vis_type, columns, profile=None):
+    # Above PLOT_POINT_THRESHOLD rows, plot reduced data so render time stays bounded
+    large = len(df) > PLOT_POINT_THRESHOLD
+
+    if vis_type == "histogram":
+        binned = profile_histogram(profile, columns[0]) if profile else None
+        if binned is not None or large:
+            centers, counts, edges = binned if binned is not None else histogram_bins(df[columns[0]])
+            # seaborn compares bins to "auto", which is ambiguous for an ndarray; a list of edges is not
+            sns.histplot(x=centers, weights=counts, bins=[float(edge) for edge in edges], kde=True, ax=ax)
+            ax.set_xlabel(columns[0])
+        else:
+            sns.histplot(df[columns[0]], kde=True, ax=ax)
+    elif vis_type == "scatter plot":
+        if large and SCATTER_REDUCTION == "hexbin":
+            x = pd.to_numeric(df[columns[0]], errors="coerce")
+            y = pd.to_numeric(df[columns[1]], errors="coerce")
+            ax.hexbin(x, y, gridsize=80, mincnt=1, bins="log", cmap="Blues")
+            ax.set_xlabel(columns[0])
+            ax.set_ylabel(columns[1])
+        elif large:
+            sample = stratified_sample(df, columns[0], columns[1], PLOT_POINT_THRESHOLD)
+            sns.scatterplot(x=sample[columns[0]], y=sample[columns[1]], ax=ax)
+        else:
+            sns.scatterplot(x=df[columns[0]], y=df[columns[1]], ax=ax)
+    elif vis_type == "box plot":
+        stats = profile_box(profile, columns[0]) if profile else None
+        if stats is not None or large:
+            ax.bxp([stats if stats is not None else box_stats(df[columns[0]], columns[0])], vert=False)
+        else:
+            sns.boxplot(x=df[columns[0]], ax=ax)
+    elif vis_type == "bar chart":
+        category_counts(df, columns[0], MAX_BAR_CATEGORIES, profile).plot(kind='bar', ax=ax)
+    elif vis_type == "line graph":
+        downsample_frame(df[columns], PLOT_POINT_THRESHOLD).plot(kind='line', ax=ax)
+    elif vis_type == "pie chart":
+        category_counts(df, columns[0], MAX_PIE_CATEGORIES, profile).plot(kind='pie', autopct='%1.1f%%', ax=ax)
+    elif vis_type == "heatmap":
+        sns.heatmap(correlation(df, profile), annot=True, cmap="coolwarm", ax=ax)
+    else:
+        raise ValueError(f"Unknown visualization type: {vis_type}")
+
+
+def render_chart(df, vis_type, columns, profile=None, fmt="png", width=800, height=600, dpi=100):
+    # Object-oriented Figure + Agg canvas: no pyplot global state, safe to run concurrently.
+    # Returns raw PNG or SVG bytes; width and height are in pixels at the given dpi.
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    # SVG keeps text as <text> elements instead of outlining every glyph as a path
+    with rc_context({"svg.fonttype": "none"}):
+        draw(fig.subplots(), df, vis_type, columns, profile)
+        buf = BytesIO()
+        fig.savefig(buf, format=fmt, dpi=dpi)
+    return buf.getvalue()
+
+
+def render_file(path, vis_type, columns, profile=None, fmt="png", width=800, height=600, dpi=100):
+    # Runs in a render worker: only the columns the chart needs are mapped in from the dataset file
+    needed = needed_columns(vis_type, columns, profile)
+    if needed == []:
+        df = pd.DataFrame()
+    else:
+        df = feather.read_table(path, columns=needed, memory_map=True).to_pandas(split_blocks=True)
+    return render_chart(df, vis_type, columns, profile, fmt, width, height, dpi)
@@ -0,0 +1,203 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from plot_reduction import MAX_BAR_CATEGORIES, MAX_PIE_CATEGORIES, PLOT_POINT_THRESHOLD
+from result_stream import paginate_sql, strip_sql
+
+# Charts over /query results are computed in MySQL: the generated SELECT becomes a derived table and only
+# the reduced series (group counts, histogram buckets, quartiles, moments, a bounded sample) come back.
+# The results are returned as a (frame, profile) pair that draw() and vega_lite_spec() already understand.
+QUERY_HISTOGRAM_BINS = int(os.getenv("QUERY_HISTOGRAM_BINS", 50))
+MAX_HEATMAP_COLUMNS = int(os.getenv("MAX_HEATMAP_COLUMNS", 12))
+MAX_FLIERS = 1000
+SAMPLE_SEED = 42
+
+
+def quote(name):
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def source(sql):
+    return f"({strip_sql(sql)}) AS q"
+
+
+def number(value):
+    return None if value is None else float(value)
+
+
+def category_sql(sql, column, limit):
+    c = f"q.{quote(column)}"
+    # Window totals are taken over the groups before LIMIT, so the tail can still be folded into "Other"
+    return (f"SELECT {c} AS value, COUNT(*) AS n, SUM(COUNT(*)) OVER () AS total_rows, "
+            f"COUNT(*) OVER () AS distinct_values FROM {source(sql)} WHERE {c} IS NOT NULL "
+            f"GROUP BY {c} ORDER BY n DESC LIMIT {int(limit)}")
+
+
+def histogram_sql(sql, column, bins):
+    # The range comes from window aggregates, so the user's query is evaluated once rather than per subquery
+    c = f"q.{quote(column)}"
+    bucket = f"LEAST(FLOOR((v - lo) / NULLIF(hi - lo, 0) * {int(bins)}), {int(bins) - 1})"
+    return (f"SELECT lo, hi, COALESCE({bucket}, 0) AS bucket, COUNT(*) AS n FROM "
+            f"(SELECT {c} AS v, MIN({c}) OVER () AS lo, MAX({c}) OVER () AS hi "
+            f"FROM {source(sql)} WHERE {c} IS NOT NULL) AS t GROUP BY lo, hi, bucket ORDER BY bucket")
+
+
+def quartile_sql(sql, column):
+    # Nearest-rank quartiles over a sorted window; MySQL has no PERCENTILE_CONT
+    c = f"q.{quote(column)}"
+
+    def pick(p):
+        return f"MAX(CASE WHEN rn = FLOOR({p} * (n - 1)) + 1 THEN v END)"
+
+    return (f"SELECT {pick(0.25)} AS q1, {pick(0.5)} AS med, {pick(0.75)} AS q3 FROM "
+            f"(SELECT {c} AS v, ROW_NUMBER() OVER (ORDER BY {c}) AS rn, COUNT(*) OVER () AS n "
+            f"FROM {source(sql)} WHERE {c} IS NOT NULL) AS t")
+
+
+def whisker_sql(sql, column, low, high):
+    c = f"q.{quote(column)}"
+    inside = f"{c} BETWEEN {low!r} AND {high!r}"
+    return (f"SELECT MIN(CASE WHEN {inside} THEN {c} END) AS whislo, MAX(CASE WHEN {inside} THEN {c} END) AS whishi "
+            f"FROM {source(sql)}")
+
+
+def flier_sql(sql, column, low, high):
+    c = f"q.{quote(column)}"
+    return f"SELECT {c} AS v FROM {source(sql)} WHERE {c} < {low!r} OR {c} > {high!r} LIMIT {MAX_FLIERS}"
+
+
+def moments_sql(sql, columns):
+    # Means and pairwise products in one scan; the correlation matrix follows from them
+    refs = [f"q.{quote(column)}" for column in columns]
+    terms = [f"AVG({ref}) AS m{i}" for i, ref in enumerate(refs)]
+    terms += [f"AVG({refs[i]} * {refs[j]}) AS p{i}_{j}"
+              for i in range(len(refs)) for j in range(i, len(refs))]
+    where = " AND ".join(f"{ref} IS NOT NULL" for ref in refs)
+    return f"SELECT {', '.join(terms)} FROM {source(sql)} WHERE {where}"
+
+
+def count_sql(sql):
+    return f"SELECT COUNT(*) AS n FROM {source(sql)}"
+
+
+def sample_sql(sql, columns, total, limit):
+    # A seeded RAND() filter keeps roughly `limit` rows, spread over the whole result instead of its head
+    select = ", ".join(f"q.{quote(column)}" for column in columns)
+    if total <= limit:
+        return f"SELECT {select} FROM {source(sql)}"
+    fraction = min(1.0, limit * 1.1 / total)
+    return f"SELECT {select} FROM {source(sql)} WHERE RAND({SAMPLE_SEED}) < {fraction!r} LIMIT {int(limit)}"
+
+
+def stride_sql(sql, columns, total, limit):
+    # Every k-th row in the result's own order, keeping its position for the x axis. MySQL drops ORDER BY from
+    # a derived table without a LIMIT, so the base query gets one covering all its rows to keep its order.
+    select = ", ".join(f"q.{quote(column)}" for column in columns)
+    step = max(1, math.ceil(total / limit))
+    return (f"SELECT * FROM (SELECT {select}, ROW_NUMBER() OVER () AS row_position "
+            f"FROM ({paginate_sql(sql, total)}) AS q) AS t WHERE MOD(row_position - 1, {step}) = 0 "
+            f"ORDER BY row_position")
+
+
+def frame(rows, columns, numeric):
+    df = pd.DataFrame(rows, columns=list(columns))
+    for column in columns:
+        if column in numeric:
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+    return df
+
+
+def chart_data(run, sql, vis_type, columns, numeric, max_points=PLOT_POINT_THRESHOLD):
+    # run(sql) -> list of row dicts. Returns (frame, profile) holding only what the chart needs.
+    profile = {"rows": 0, "columns": {}, "correlation": {"columns": [], "matrix": []}}
+    empty = pd.DataFrame(columns=list(columns))
+    numeric = set(numeric)
+
+    if vis_type in ("bar chart", "pie chart"):
+        column = columns[0]
+        limit = MAX_BAR_CATEGORIES if vis_type == "bar chart" else MAX_PIE_CATEGORIES
+        rows = run(category_sql(sql, column, limit))
+        profile["rows"] = int(rows[0]["total_rows"]) if rows else 0
+        profile["columns"][str(column)] = {
+            "nulls": 0,
+            "unique": int(rows[0]["distinct_values"]) if rows else 0,
+            "top": [[row["value"], int(row["n"])] for row in rows]
+        }
+        return empty, profile
+
+    if vis_type in ("histogram", "box plot"):
+        column = columns[0]
+        if column not in numeric:
+            raise ValueError(f"A {vis_type} needs a numeric column; '{column}' is not numeric")
+        if vis_type == "histogram":
+            rows = run(histogram_sql(sql, column, QUERY_HISTOGRAM_BINS))
+            if not rows:
+                raise ValueError(f"No values in '{column}'")
+            lo, hi = number(rows[0]["lo"]), number(rows[0]["hi"])
+            if lo == hi:
+                edges, counts = [lo - 0.5, lo + 0.5], [sum(int(row["n"]) for row in rows)]
+            else:
+                edges, counts = np.linspace(lo, hi, QUERY_HISTOGRAM_BINS + 1).tolist(), [0] * QUERY_HISTOGRAM_BINS
+                for row in rows:
+                    counts[int(row["bucket"])] += int(row["n"])
+            profile["columns"][str(column)] = {"histogram": {"edges": edges, "counts": counts}}
+            return empty, profile
+
+        quartiles = run(quartile_sql(sql, column))[0]
+        if quartiles["med"] is None:
+            raise ValueError(f"No values in '{column}'")
+        q1, median, q3 = number(quartiles["q1"]), number(quartiles["med"]), number(quartiles["q3"])
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        whiskers = run(whisker_sql(sql, column, low, high))[0]
+        fliers = [number(row["v"]) for row in run(flier_sql(sql, column, low, high))]
+        profile["columns"][str(column)] = {"box": {
+            "label": str(column),
+            "med": median,
+            "q1": q1,
+            "q3": q3,
+            "whislo": number(whiskers["whislo"]) if whiskers["whislo"] is not None else q1,
+            "whishi": number(whiskers["whishi"]) if whiskers["whishi"] is not None else q3,
+            "fliers": fliers
+        }}
+        return empty, profile
+
+    if vis_type == "heatmap":
+        chosen = [column for column in columns if column in numeric] or sorted(numeric)
+        chosen = chosen[:MAX_HEATMAP_COLUMNS]
+        if len(chosen) < 2:
+            raise ValueError("A heatmap needs at least two numeric columns")
+        row = run(moments_sql(sql, chosen))[0]
+        k = len(chosen)
+        means = [number(row[f"m{i}"]) for i in range(k)]
+
+        def product(i, j):
+            return number(row[f"p{min(i, j)}_{max(i, j)}"])
+
+        if any(mean is None for mean in means):
+            raise ValueError("No rows with values in every heatmap column")
+        variances = [product(i, i) - means[i] ** 2 for i in range(k)]
+        matrix = [[None if variances[i] <= 0 or variances[j] <= 0 else
+                   (product(i, j) - means[i] * means[j]) / math.sqrt(variances[i] * variances[j])
+                   for j in range(k)] for i in range(k)]
+        profile["correlation"] = {"columns": [str(column) for column in chosen], "matrix": matrix}
+        return empty, profile
+
+    if vis_type in ("scatter plot", "line graph"):
+        total = int(run(count_sql(sql))[0]["n"])
+        profile["rows"] = total
+        if vis_type == "scatter plot":
+            rows = run(sample_sql(sql, columns[:2], total, max_points))
+            return frame(rows, columns[:2], numeric), profile
+        if total <= max_points:
+            # Small enough to plot as is: the base query runs unchanged, so its ORDER BY applies directly
+            df = frame(run(strip_sql(sql)), columns, numeric)
+            df.index = pd.RangeIndex(1, len(df) + 1, name="row_position")
+            return df, profile
+        rows = run(stride_sql(sql, columns, total, max_points))
+        df = frame(rows, list(columns) + ["row_position"], numeric)
+        return df.set_index("row_position"), profile
+
+    raise ValueError(f"Unknown visualization type: {vis_type}")
@@ -0,0 +1,86 @@
+from column_profile import profile_box, profile_histogram, scalar
+from plot_reduction import (MAX_BAR_CATEGORIES, MAX_PIE_CATEGORIES, PLOT_POINT_THRESHOLD, box_stats, category_counts,
+                            correlation, downsample_frame, histogram_bins, stratified_sample)
+
+VEGA_LITE_SCHEMA = "https://vega.github.io/schema/vega-lite/v5.json"
+
+
+def records(rows):
+    return [{key: scalar(value) for key, value in row.items()} for row in rows]
+
+
+def vega_lite_spec(df, vis_type, columns, profile=None, width=800, height=600):
+    # Client-side rendering: the data is aggregated or reduced here exactly as draw() would, then shipped as values
+    spec = {"$schema": VEGA_LITE_SCHEMA, "width": width, "height": height}
+
+    if vis_type == "histogram":
+        binned = profile_histogram(profile, columns[0]) if profile else None
+        _, counts, edges = binned if binned is not None else histogram_bins(df[columns[0]])
+        spec["data"] = {"values": records(
+            {"start": start, "end": end, "count": count} for start, end, count in zip(edges[:-1], edges[1:], counts))}
+        spec["mark"] = "bar"
+        spec["encoding"] = {
+            "x": {"field": "start", "type": "quantitative", "bin": {"binned": True}, "title": str(columns[0])},
+            "x2": {"field": "end"},
+            "y": {"field": "count", "type": "quantitative"}
+        }
+    elif vis_type == "scatter plot":
+        x, y = columns[0], columns[1]
+        frame = stratified_sample(df, x, y, PLOT_POINT_THRESHOLD)
+        spec["data"] = {"values": records({"x": a, "y": b} for a, b in zip(frame[x], frame[y]))}
+        spec["mark"] = {"type": "point", "tooltip": True}
+        spec["encoding"] = {
+            "x": {"field": "x", "type": "quantitative", "title": str(x)},
+            "y": {"field": "y", "type": "quantitative", "title": str(y)}
+        }
+    elif vis_type == "box plot":
+        stats = (profile_box(profile, columns[0]) if profile else None) or box_stats(df[columns[0]], str(columns[0]))
+        x = {"type": "quantitative", "title": str(columns[0])}
+        spec["data"] = {"values": records([{key: stats[key] for key in ("whislo", "q1", "med", "q3", "whishi")}])}
+        spec["layer"] = [
+            {"mark": "rule", "encoding": {"x": {"field": "whislo", **x}, "x2": {"field": "whishi"}}},
+            {"mark": {"type": "bar", "size": 40}, "encoding": {"x": {"field": "q1", **x}, "x2": {"field": "q3"}}},
+            {"mark": {"type": "tick", "size": 40, "color": "white"}, "encoding": {"x": {"field": "med", **x}}},
+            {
+                "data": {"values": records({"value": value} for value in stats["fliers"])},
+                "mark": "point",
+                "encoding": {"x": {"field": "value", **x}}
+            }
+        ]
+    elif vis_type in ("bar chart", "pie chart"):
+        limit = MAX_BAR_CATEGORIES if vis_type == "bar chart" else MAX_PIE_CATEGORIES
+        counts = category_counts(df, columns[0], limit, profile)
+        spec["data"] = {"values": records(
+            {"category": str(category), "count": count} for category, count in counts.items())}
+        category = {"field": "category", "type": "nominal", "sort": None, "title": str(columns[0])}
+        if vis_type == "bar chart":
+            spec["mark"] = "bar"
+            spec["encoding"] = {"x": category, "y": {"field": "count", "type": "quantitative"}}
+        else:
+            spec["mark"] = {"type": "arc", "tooltip": True}
+            spec["encoding"] = {"theta": {"field": "count", "type": "quantitative"}, "color": category}
+    elif vis_type == "line graph":
+        frame = downsample_frame(df[columns], PLOT_POINT_THRESHOLD)
+        spec["data"] = {"values": records(
+            {"index": index, "series": str(column), "value": value}
+            for column in columns
+            for index, value in zip(frame.index, frame[column]))}
+        spec["mark"] = "line"
+        spec["encoding"] = {
+            "x": {"field": "index", "type": "quantitative"},
+            "y": {"field": "value", "type": "quantitative"},
+            "color": {"field": "series", "type": "nominal"}
+        }
+    elif vis_type == "heatmap":
+        matrix = correlation(df, profile)
+        spec["data"] = {"values": records(
+            {"x": str(a), "y": str(b), "value": matrix.at[a, b]} for a in matrix.index for b in matrix.columns)}
+        spec["mark"] = {"type": "rect", "tooltip": True}
+        spec["encoding"] = {
+            "x": {"field": "x", "type": "nominal", "sort": None, "title": None},
+            "y": {"field": "y", "type": "nominal", "sort": None, "title": None},
+            "color": {"field": "value", "type": "quantitative", "scale": {"scheme": "redblue", "domain": [-1, 1]}}
+        }
+    else:
+        raise ValueError(f"Unknown visualization type: {vis_type}")
+    return spec
@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def scalar(value):
+    # JSON-safe plain Python value
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, (int, float, str, bool)):
+        return value
+    if pd.isna(value):
+        return None
+    return str(value)
+
+
+def profile_frame(df, top_k=50):
+    # One vectorized pass per statistic over all columns, computed once at upload time
+    rows = len(df)
+    nulls = df.isna().sum()
+    unique = df.nunique(dropna=True)
+    numeric = df.select_dtypes("number")
+    if len(numeric.columns):
+        minimum, maximum = numeric.min(), numeric.max()
+        quantiles = numeric.quantile(list(QUANTILES))
+    columns = {}
+    for column in df.columns:
+        info = {
+            "dtype": str(df[column].dtype),
+            "nulls": int(nulls[column]),
+            "unique": int(unique[column])
+        }
+        if column in numeric.columns:
+            info["min"] = scalar(minimum[column])
+            info["max"] = scalar(maximum[column])
+            info["quantiles"] = {f"{int(q * 100)}%": scalar(quantiles.at[q, column]) for q in QUANTILES}
+        if info["unique"] < rows or rows <= top_k:
+            # Skipped for all-unique columns such as ids: their top values are just their first rows
+            counts = df[column].value_counts(dropna=True).head(top_k)
+            info["top"] = [[scalar(value), int(count)] for value, count in counts.items()]
+        columns[str(column)] = info
+
+    correlation = numeric.corr() if len(numeric.columns) > 1 else pd.DataFrame()
+    return {
+        "rows": rows,
+        "columns": columns,
+        "correlation": {
+            "columns": [str(column) for column in correlation.columns],
+            "matrix": [[scalar(value) for value in row] for row in correlation.to_numpy()]
+        }
+    }
+
+
+def numeric_columns(profile):
+    return [column for column, info in profile["columns"].items() if "quantiles" in info]
+
+
+def profile_counts(profile, column, max_categories):
+    # value_counts() for bar/pie charts straight from the profile, folding the tail into "Other"
+    info = profile["columns"].get(str(column))
+    if info is None or "top" not in info:
+        return None
+    top = info["top"]
+    complete = info["unique"] <= len(top)
+    if complete and len(top) <= max_categories:
+        return pd.Series({value: count for value, count in top})
+    if len(top) < max_categories - 1:
+        return None
+    kept = top[:max_categories - 1]
+    other = profile["rows"] - info["nulls"] - sum(count for _, count in kept)
+    return pd.Series({**{value: count for value, count in kept}, "Other": other})
+
+
+def profile_correlation(profile):
+    correlation = profile["correlation"]
+    if not correlation["columns"]:
+        return None
+    return pd.DataFrame(correlation["matrix"], index=correlation["columns"], columns=correlation["columns"])
+
+
+def profile_histogram(profile, column):
+    # Pre-binned (centers, counts, edges), present when the bins were computed outside pandas (e.g. in SQL)
+    info = profile["columns"].get(str(column), {})
+    if "histogram" not in info:
+        return None
+    edges = np.asarray(info["histogram"]["edges"], dtype=float)
+    counts = np.asarray(info["histogram"]["counts"])
+    return (edges[:-1] + edges[1:]) / 2, counts, edges
+
+
+def profile_box(profile, column):
+    # matplotlib bxp() statistics, present when they were computed outside pandas
+    return profile["columns"].get(str(column), {}).get("box")
+
+
+def describe_profile(profile, max_values=5):
+    # Compact one-line-per-column summary for LLM prompts
+    lines = [f"{profile['rows']} rows"]
+    for column, info in profile["columns"].items():
+        parts = [info["dtype"], f"{info['unique']} unique"]
+        if info["nulls"]:
+            parts.append(f"{info['nulls']} nulls")
+        if "quantiles" in info:
+            parts.append(f"range {info['min']}..{info['max']}, median {info['quantiles']['50%']}")
+        elif info.get("top") and info["unique"] <= max_values * 4:
+            parts.append("values " + ", ".join(str(value) for value, _ in info["top"][:max_values]))
+        lines.append(f"- {column} ({'; '.join(parts)})")
+    return "\n".join(lines)
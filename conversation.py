@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Multi-turn /query sessions: the last few turns go into the prompt verbatim, older ones are folded into a
+# bounded summary. Sessions live in process memory, so under gunicorn a session sticks to the worker that
+# serves it (route by session id, or run a single worker with threads).
+
+
+class Turn:
+    __slots__ = ("question", "sql", "timestamp")
+
+    def __init__(self, question, sql):
+        self.question = question
+        self.sql = sql
+        self.timestamp = time.time()
+
+    def to_dict(self):
+        return {"question": self.question, "sql": self.sql}
+
+
+def fold_turns(summary, turns, max_chars):
+    # Default summariser: one line per folded turn, oldest lines dropped once the summary is over max_chars
+    lines = summary.splitlines() if summary else []
+    for turn in turns:
+        sql = " ".join(turn.sql.split())
+        lines.append(f"- {turn.question} -> {sql[:200]}")
+    while len(lines) > 1 and len("\n".join(lines)) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)[-max_chars:]
+
+
+class Conversation:
+    def __init__(self, session_id, max_turns=4, summary_chars=1500, summarize=None):
+        self.session_id = session_id
+        self.max_turns = max_turns
+        self.summary_chars = summary_chars
+        self.summarize = summarize or fold_turns
+        self.turns = deque()
+        self.summary = ""
+        self.folded = 0
+        # Tables named in the prompt prefix, pinned per schema checksum so follow-ups reuse the same prefix
+        self.tables = None
+        self.checksum = None
+        self.updated = time.time()
+        self.lock = threading.Lock()
+        # Held for a whole fold, which may call an LLM; self.lock is only held to read or swap state
+        self.fold_lock = threading.Lock()
+
+    @property
+    def turn_count(self):
+        return self.folded + len(self.turns)
+
+    def last_sql(self):
+        with self.lock:
+            return self.turns[-1].sql if self.turns else None
+
+    def pinned_tables(self, checksum):
+        with self.lock:
+            return self.tables if checksum == self.checksum else None
+
+    def pin_tables(self, checksum, tables):
+        with self.lock:
+            self.checksum = checksum
+            self.tables = list(tables) if tables else None
+
+    def add(self, question, sql):
+        with self.lock:
+            self.turns.append(Turn(question, sql))
+            self.updated = time.time()
+        # The summary is built outside self.lock, so prompt_block() and last_sql() never wait on an LLM call.
+        # Folded turns stay in self.turns until the new summary is swapped in.
+        with self.fold_lock:
+            with self.lock:
+                old = list(self.turns)[:max(len(self.turns) - self.max_turns, 0)]
+                summary = self.summary
+            if not old:
+                return
+            summary = self.summarize(summary, old, self.summary_chars)
+            with self.lock:
+                for _ in old:
+                    self.turns.popleft()
+                self.summary = summary
+                self.folded += len(old)
+
+    def prompt_block(self):
+        # The delta part of a follow-up prompt; empty on the first turn
+        with self.lock:
+            if not self.turns and not self.summary:
+                return ""
+            lines = []
+            if self.summary:
+                lines += ["Earlier questions:", self.summary]
+            for turn in self.turns:
+                lines += [f"Q: {turn.question}", f"SQL: {turn.sql}"]
+        return "**Conversation So Far:**\n" + "\n".join(lines) + "\n\n"
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "session_id": self.session_id,
+                "turns": self.folded + len(self.turns),
+                "summary": self.summary,
+                "recent": [turn.to_dict() for turn in self.turns],
+                "tables": self.tables,
+                "updated": self.updated
+            }
+
+
+class ConversationStore:
+    def __init__(self, max_sessions=1000, ttl=3600, max_turns=4, summary_chars=1500, summarize=None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.summary_chars = summary_chars
+        self.summarize = summarize
+        self.sessions = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.lock = threading.Lock()
+
+    def get(self, session_id, create=True):
+        now = time.time()
+        with self.lock:
+            conversation = self.sessions.get(session_id)
+            if conversation is not None and now - conversation.updated >= self.ttl:
+                del self.sessions[session_id]
+                self.expired += 1
+                conversation = None
+            if conversation is None and create:
+                conversation = self.sessions[session_id] = Conversation(
+                    session_id, self.max_turns, self.summary_chars, self.summarize
+                )
+                self.created += 1
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+                    self.expired += 1
+            if conversation is not None:
+                self.sessions.move_to_end(session_id)
+            return conversation
+
+    def drop(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def stats(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+            created, expired = self.created, self.expired
+        return {
+            "sessions": len(sessions),
+            "turns": sum(conversation.turn_count for conversation in sessions),
+            "summarized_turns": sum(conversation.folded for conversation in sessions),
+            "created": created,
+            "expired": expired
+        }
@@ -0,0 +1,82 @@
+import json
+import re
+
+LEADING_SELECT = re.compile(r"^\s*select\b", re.IGNORECASE)
+# Queries whose scan stops early once LIMIT rows are produced
+NOT_LIMITABLE = re.compile(
+    r"\b(group\s+by|order\s+by|distinct|having|union)\b|\b(count|sum|avg|min|max)\s*\(",
+    re.IGNORECASE
+)
+# A full scan (access_type ALL, or a full index scan) keeping less than this percentage of its rows may read the
+# whole table before LIMIT rows have matched, so LIMIT does not bound it
+FILTERED_SCAN_PERCENT = 90.0
+FULL_SCANS = ("ALL", "index")
+
+
+def add_time_limit(sql, max_execution_ms):
+    # Optimizer hint instead of SET SESSION, so no extra round trip per statement
+    if not max_execution_ms:
+        return sql
+    return LEADING_SELECT.sub(f"SELECT /*+ MAX_EXECUTION_TIME({int(max_execution_ms)}) */", sql, count=1)
+
+
+def is_limitable(sql, cost=None):
+    # cost: estimate_cost() of the same statement; without it only the SQL shape is checked
+    if cost is not None and cost.get("filtered_scans"):
+        return False
+    return not NOT_LIMITABLE.search(sql)
+
+
+def _filtered_scans(node):
+    tables = []
+    if isinstance(node, list):
+        for item in node:
+            tables += _filtered_scans(item)
+        return tables
+    if not isinstance(node, dict):
+        return tables
+    table = node.get("table")
+    if isinstance(table, dict) and table.get("access_type") in FULL_SCANS:
+        if float(table.get("filtered", 100)) < FILTERED_SCAN_PERCENT:
+            tables.append(table.get("table_name"))
+    for value in node.values():
+        if isinstance(value, (dict, list)):
+            tables += _filtered_scans(value)
+    return tables
+
+
+def _examined(node, prefix=1.0):
+    examined = 0.0
+    if isinstance(node, list):
+        for item in node:
+            examined += _examined(item, prefix)
+        return examined
+    if not isinstance(node, dict):
+        return examined
+
+    if "nested_loop" in node:
+        # rows_produced_per_join is the running join size feeding the next table
+        rows = prefix
+        for item in node["nested_loop"]:
+            table = item.get("table", {})
+            examined += rows * float(table.get("rows_examined_per_scan", 0))
+            rows = max(float(table.get("rows_produced_per_join", rows)), 1.0)
+            examined += _examined({k: v for k, v in table.items() if isinstance(v, (dict, list))})
+    if "table" in node:
+        table = node["table"]
+        examined += prefix * float(table.get("rows_examined_per_scan", 0))
+        examined += _examined({k: v for k, v in table.items() if isinstance(v, (dict, list))})
+    for key, value in node.items():
+        if key not in ("nested_loop", "table") and isinstance(value, (dict, list)):
+            examined += _examined(value)
+    return examined
+
+
+def estimate_cost(plan_json):
+    plan = json.loads(plan_json)
+    query_block = plan.get("query_block", {})
+    return {
+        "rows_examined": int(_examined(query_block)),
+        "query_cost": float(query_block.get("cost_info", {}).get("query_cost", 0)),
+        "filtered_scans": _filtered_scans(query_block)
+    }
@@ -0,0 +1,94 @@
+import base64
+import io
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+class Base64Reader(io.RawIOBase):
+    # Decodes base64 text lazily so the full decoded CSV never sits in memory next to the JSON body
+    def __init__(self, text, block=4 * 256 * 1024):
+        self.text = text
+        self.position = 0
+        self.block = block
+        self.pending = b""
+        # Base64 characters read but not yet decoded, fewer than one 4-character group
+        self.carry = ""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while len(self.pending) < len(buffer) and self.position < len(self.text):
+            # MIME-style base64 wraps lines; whitespace is dropped so only whole 4-character groups are decoded
+            chunk = self.carry + "".join(self.text[self.position:self.position + self.block].split())
+            self.position += self.block
+            usable = len(chunk) if self.position >= len(self.text) else len(chunk) - len(chunk) % 4
+            self.carry = chunk[usable:]
+            self.pending += base64.b64decode(chunk[:usable])
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+def compact_chunk(chunk):
+    for column in chunk.columns:
+        values = chunk[column]
+        if pd.api.types.is_integer_dtype(values):
+            chunk[column] = pd.to_numeric(values, downcast="integer")
+        elif pd.api.types.is_float_dtype(values):
+            narrow = values.astype(np.float32)
+            # Only narrow when every value survives the round trip
+            if ((narrow.astype(np.float64) == values) | values.isna()).all():
+                chunk[column] = narrow
+        elif values.dtype == object:
+            chunk[column] = values.astype("category")
+    return chunk
+
+
+def combine_chunks(chunks, category_ratio):
+    if len(chunks) == 1:
+        df = chunks[0]
+    else:
+        columns = {}
+        for column in chunks[0].columns:
+            parts = [chunk[column] for chunk in chunks]
+            if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+                columns[column] = pd.Series(union_categoricals(parts, ignore_order=True))
+            else:
+                # Mixed inference across chunks (e.g. int8 and int16) settles on the common dtype
+                columns[column] = pd.concat([part.astype(object) if isinstance(part.dtype, pd.CategoricalDtype)
+                                             else part for part in parts], ignore_index=True)
+        df = pd.DataFrame(columns)
+
+    for column in df.columns:
+        # Near-unique strings gain nothing from a category encoding
+        if isinstance(df[column].dtype, pd.CategoricalDtype) and len(df[column].cat.categories) > category_ratio * len(df):
+            df[column] = df[column].astype(object)
+    return df
+
+
+def read_csv_compact(source, chunksize=100000, category_ratio=0.5, arrow=False):
+    if arrow and HAS_PYARROW:
+        return pd.read_csv(source, engine="pyarrow", dtype_backend="pyarrow")
+    chunks = [compact_chunk(chunk) for chunk in pd.read_csv(source, chunksize=chunksize)]
+    if not chunks:
+        return pd.DataFrame()
+    return combine_chunks(chunks, category_ratio)
+
+
+def memory_report(df):
+    usage = df.memory_usage(deep=True)
+    return {
+        "rows": len(df),
+        "bytes": int(usage.sum()),
+        "columns": {column: {"dtype": str(df[column].dtype), "bytes": int(usage[column])} for column in df.columns}
+    }
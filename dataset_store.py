@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class StoredDataset:
+    __slots__ = ("df", "size", "version", "last_access", "profile")
+
+    def __init__(self, df, size, version, profile=None):
+        self.df = df
+        self.size = size
+        self.version = version
+        self.last_access = time.time()
+        self.profile = profile
+
+
+class DatasetStore:
+    # Uploads are written through to uncompressed Feather files in a node-local directory,
+    # so any worker can serve any user; each worker keeps an LRU of hot frames in memory.
+    def __init__(self, directory, memory_budget, user_quota, idle_ttl, sweep_interval=60):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.user_quota = user_quota
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self.last_sweep = 0.0
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, user_id):
+        name = hashlib.sha1(str(user_id).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.feather")
+
+    def fingerprint(self, user_id):
+        # Changes with every upload, which is all the chart caches need to key on
+        path = self.path(user_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+    def profile_path(self, user_id):
+        return self.path(user_id)[:-len(".feather")] + ".profile.json"
+
+    def put(self, user_id, df, profile=None):
+        size = int(df.memory_usage(deep=True).sum())
+        if self.user_quota and size > self.user_quota:
+            raise QuotaExceeded(f"Dataset uses {size} bytes, over the per-user quota of {self.user_quota}")
+
+        path = self.path(user_id)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        df = df.reset_index(drop=True)
+        try:
+            feather.write_feather(df, tmp, compression="uncompressed")
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            # Mixed-type object columns cannot be written as-is
+            df = df.astype({column: str for column in df.columns if df[column].dtype == object})
+            feather.write_feather(df, tmp, compression="uncompressed")
+        if profile is not None:
+            # The sidecar lands first so a reader never sees a new dataset with an old profile
+            with open(f"{tmp}.json", "w") as f:
+                json.dump(profile, f)
+            os.replace(f"{tmp}.json", self.profile_path(user_id))
+        os.replace(tmp, path)
+        self._remember(user_id, df, size, os.stat(path).st_mtime_ns, profile)
+        self.sweep()
+        return size
+
+    def get(self, user_id):
+        path = self.path(user_id)
+        try:
+            version = os.stat(path).st_mtime_ns
+            # Access time marks the dataset as in use for every worker's idle sweep; mtime stays the version
+            os.utime(path, ns=(time.time_ns(), version))
+        except FileNotFoundError:
+            with self.lock:
+                self._drop(user_id)
+            return None
+
+        with self.lock:
+            entry = self.entries.get(user_id)
+            # Another worker may have replaced the file since this copy was loaded
+            if entry is not None and entry.version == version:
+                entry.last_access = time.time()
+                self.entries.move_to_end(user_id)
+                return entry.df
+
+        # Memory-mapped read: numeric columns without nulls stay zero-copy over the page cache
+        table = feather.read_table(path, memory_map=True)
+        df = table.to_pandas(split_blocks=True)
+        self._remember(user_id, df, int(df.memory_usage(deep=True).sum()), version)
+        self.sweep()
+        return df
+
+    def get_profile(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry.profile is not None:
+                return entry.profile
+        try:
+            with open(self.profile_path(user_id)) as f:
+                profile = json.load(f)
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None:
+                entry.profile = profile
+        return profile
+
+    def _remember(self, user_id, df, size, version, profile=None):
+        with self.lock:
+            self._drop(user_id)
+            if self.memory_budget and size > self.memory_budget:
+                return
+            self.entries[user_id] = StoredDataset(df, size, version, profile)
+            self.bytes += size
+            while self.memory_budget and self.bytes > self.memory_budget:
+                # Spilled datasets stay on disk and are mapped back on the next access
+                evicted_id, evicted = self.entries.popitem(last=False)
+                self.bytes -= evicted.size
+                logging.info(f"Dataset for {evicted_id} evicted from memory ({evicted.size} bytes)")
+
+    def _drop(self, user_id):
+        entry = self.entries.pop(user_id, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def sweep(self):
+        now = time.time()
+        if not self.idle_ttl or now - self.last_sweep < self.sweep_interval:
+            return
+        self.last_sweep = now
+        with self.lock:
+            for user_id in [uid for uid, entry in self.entries.items() if now - entry.last_access > self.idle_ttl]:
+                self._drop(user_id)
+        for name in os.listdir(self.directory):
+            if not name.endswith(".feather"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.stat(path).st_atime > self.idle_ttl:
+                    os.remove(path)
+                    os.remove(path[:-len(".feather")] + ".profile.json")
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self.lock:
+            return {
+                "in_memory": len(self.entries),
+                "bytes": self.bytes,
+                "memory_budget": self.memory_budget,
+                "on_disk": len([name for name in os.listdir(self.directory) if name.endswith(".feather")])
+            }
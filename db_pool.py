@@ -0,0 +1,87 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import pooling
+
+
+class ConnectionPools:
+    def __init__(self, pool_size=5, checkout_timeout=10):
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def register(self, host, user, password, database, port):
+        profile = f"{user}@{host}:{port}/{database}"
+        config = {
+            "host": host,
+            "user": user,
+            "password": password,
+            "database": database,
+            "port": port,
+            "autocommit": True
+        }
+        with self.lock:
+            pool = self.pools.get(profile)
+            if pool is None or pool.config != config:
+                pool = self.pools[profile] = ProfilePool(profile, config, self.pool_size)
+        # Borrow once so bad credentials fail at /connect rather than at /query
+        with self.connection(profile):
+            pass
+        return profile
+
+    def profiles(self):
+        with self.lock:
+            return list(self.pools)
+
+    @contextmanager
+    def connection(self, profile):
+        with self.lock:
+            pool = self.pools.get(profile)
+        if pool is None:
+            raise mysql.connector.InterfaceError(f"No connection registered for {profile}")
+
+        connection = pool.borrow(self.checkout_timeout)
+        try:
+            yield connection
+        finally:
+            # Returns the connection to its pool
+            connection.close()
+
+
+class ProfilePool:
+    def __init__(self, profile, config, pool_size):
+        self.config = config
+        # mysql.connector limits pool names to 64 characters
+        self.pool = pooling.MySQLConnectionPool(
+            pool_name=f"agent_{abs(hash(profile)) % 10 ** 12}",
+            pool_size=pool_size,
+            pool_reset_session=True,
+            **config
+        )
+
+    def borrow(self, checkout_timeout):
+        # MySQLConnectionPool raises immediately when exhausted, so wait here
+        deadline = time.monotonic() + checkout_timeout
+        delay = 0.005
+        while True:
+            try:
+                connection = self.pool.get_connection()
+                break
+            except pooling.PoolError:
+                if time.monotonic() >= deadline:
+                    raise pooling.PoolError(f"Timed out after {checkout_timeout}s waiting for a connection")
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+
+        # Health check on borrow, reconnecting stale sockets in place
+        try:
+            connection.ping(reconnect=True, attempts=2, delay=0)
+        except mysql.connector.Error as err:
+            logging.warning(f"Discarding unhealthy pooled connection: {err}")
+            connection.close()
+            raise
+        return connection
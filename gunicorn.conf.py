@@ -0,0 +1,24 @@
+import gc
+import os
+
+# gunicorn -c gunicorn.conf.py Backend:app
+# With preload_app the master imports Backend (and, through PRELOAD_CHARTS, pandas/matplotlib/seaborn) once
+# and forks workers that share those pages copy-on-write. The LLM client, MySQL pools, render pool and SQLite
+# cache are opened per worker after the fork. GUNICORN_PRELOAD=0 boots workers independently, each importing
+# the chart stack on its first /upload or /visualize.
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 180))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1").lower() in ("1", "true", "yes")
+
+if preload_app:
+    os.environ.setdefault("PRELOAD_CHARTS", "1")
+
+
+def when_ready(server):
+    if preload_app:
+        # Objects loaded so far move to a permanent generation, so the workers' collections never write to
+        # (and un-share) the pages holding them
+        gc.collect()
+        gc.freeze()
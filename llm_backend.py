@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+
+# Anything with generate_content(prompt) / generate_content_async(prompt) returning an object with .text
+# can stand in for the Gemini model. LLM_BACKEND picks one:
+#   gemini (default)    google.generativeai, GEMINI_MODEL
+#   fake                deterministic canned answers after LLM_FAKE_LATENCY seconds (LLM_FAKE_SCRIPT: rules file)
+#   replay:<path>       answers recorded earlier with record:<path>, by prompt hash
+#   record:<path>       Gemini, appending every prompt/response pair to <path>
+# Servers use shared_model(): one client per process, created on first use rather than at import.
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+gemini_lock = threading.Lock()
+gemini_configured = False
+
+
+class FakeResponse:
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+
+def prompt_key(prompt):
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+
+
+def section(prompt, title):
+    # Body of a "**Title:**" block in the SQL agent prompts
+    match = re.search(rf"\*\*{re.escape(title)}:\*\*\n(.*?)(?:\n\n\*\*|\Z)", prompt, re.DOTALL)
+    return match.group(1).strip() if match else None
+
+
+class FakeModel:
+    # Deterministic stand-in for benchmarks and offline runs. Script rules ({"match": regex, "response": text})
+    # are tried in order against the question; without a match, answers are derived from the prompt itself.
+    def __init__(self, latency=0.0, jitter=0.2, script=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rules = []
+        if script:
+            with open(script, encoding="utf-8") as f:
+                self.rules = [(re.compile(rule["match"], re.IGNORECASE), rule["response"]) for rule in json.load(f)]
+
+    def delay(self, prompt):
+        # Same prompt, same delay: crc32 spreads it uniformly over latency * (1 +/- jitter)
+        spread = (zlib.crc32(prompt.encode("utf-8")) / 0xFFFFFFFF) * 2 - 1
+        return max(0.0, self.latency * (1 + self.jitter * spread))
+
+    def answer(self, prompt):
+        question = section(prompt, "Natural Language Query")
+        if question is None:
+            match = re.search(r'interpret the following query:\s*"(.*?)"', prompt, re.DOTALL)
+            question = match.group(1) if match else prompt
+        for pattern, response in self.rules:
+            if pattern.search(question):
+                return response
+
+        current = section(prompt, "Current SQL")
+        if current:
+            # Refinement and optimization: hand back the SQL unchanged
+            return current
+        columns = re.search(r"Given the dataset with columns (\[.*?\])", prompt, re.DOTALL)
+        if columns:
+            names = re.findall(r"'([^']*)'", columns.group(1))
+            return json.dumps({"visualization": "histogram", "columns": names[:1]})
+        table = re.search(r"^Table (\S+) \(", prompt, re.MULTILINE)
+        if table:
+            return f"SELECT * FROM {table.group(1)} LIMIT 10"
+        return "SELECT 1"
+
+    def generate_content(self, prompt):
+        time.sleep(self.delay(prompt))
+        return FakeResponse(self.answer(prompt))
+
+    async def generate_content_async(self, prompt):
+        await asyncio.sleep(self.delay(prompt))
+        return FakeResponse(self.answer(prompt))
+
+
+class ReplayModel:
+    # Serves responses captured by RecordingModel; unknown prompts fall back to FakeModel so runs never stall
+    def __init__(self, path, fallback=None):
+        self.responses = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.responses[record["key"]] = record["response"]
+        self.fallback = fallback or FakeModel()
+        self.misses = 0
+
+    def generate_content(self, prompt):
+        text = self.responses.get(prompt_key(prompt))
+        if text is None:
+            self.misses += 1
+            return self.fallback.generate_content(prompt)
+        return FakeResponse(text)
+
+    async def generate_content_async(self, prompt):
+        text = self.responses.get(prompt_key(prompt))
+        if text is None:
+            self.misses += 1
+            return await self.fallback.generate_content_async(prompt)
+        return FakeResponse(text)
+
+
+class RecordingModel:
+    def __init__(self, model, path):
+        self.model = model
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self, prompt, response):
+        line = json.dumps({"key": prompt_key(prompt), "prompt": prompt, "response": response.text})
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        return response
+
+    def generate_content(self, prompt):
+        return self.record(prompt, self.model.generate_content(prompt))
+
+    async def generate_content_async(self, prompt):
+        return self.record(prompt, await self.model.generate_content_async(prompt))
+
+
+def gemini(api_key=None):
+    # google.generativeai, imported and configured once per process on first use
+    global gemini_configured
+    import google.generativeai as genai
+
+    if not gemini_configured:
+        with gemini_lock:
+            if not gemini_configured:
+                genai.configure(api_key=api_key or os.getenv("API_KEY"))
+                gemini_configured = True
+    return genai
+
+
+def gemini_model(api_key=None):
+    return gemini(api_key).GenerativeModel(GEMINI_MODEL)
+
+
+def create_model(backend=None, api_key=None):
+    backend = backend or os.getenv("LLM_BACKEND", "gemini")
+    kind, _, path = backend.partition(":")
+    if kind == "fake":
+        return FakeModel(
+            latency=float(os.getenv("LLM_FAKE_LATENCY", 0)),
+            jitter=float(os.getenv("LLM_FAKE_JITTER", 0.2)),
+            script=os.getenv("LLM_FAKE_SCRIPT")
+        )
+    if kind == "replay":
+        return ReplayModel(path)
+    if kind == "record":
+        return RecordingModel(gemini_model(api_key), path)
+    if kind != "gemini":
+        raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+    logging.info(f"Using Gemini model {GEMINI_MODEL}")
+    return gemini_model(api_key)
+
+
+class SharedModel:
+    # Stands in for the model everywhere and creates it on first use. Nothing is opened at import, so a gunicorn
+    # --preload master never holds a gRPC channel its workers would inherit; a forked child starts without one.
+    def __init__(self, backend=None, api_key=None):
+        self.backend = backend
+        self.api_key = api_key
+        self.model = None
+        self.lock = threading.Lock()
+        os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        self.model = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        model = self.model
+        if model is None:
+            with self.lock:
+                if self.model is None:
+                    self.model = create_model(self.backend, self.api_key)
+                model = self.model
+        return model
+
+    def generate_content(self, prompt):
+        return self.get().generate_content(prompt)
+
+    async def generate_content_async(self, prompt):
+        return await self.get().generate_content_async(prompt)
+
+    def __getattr__(self, name):
+        # Anything else (model_name, ...) is the real model's
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+
+shared_models = {}
+shared_models_lock = threading.Lock()
+
+
+def shared_model(backend=None, api_key=None):
+    key = (backend or os.getenv("LLM_BACKEND", "gemini"), api_key)
+    with shared_models_lock:
+        model = shared_models.get(key)
+        if model is None:
+            model = shared_models[key] = SharedModel(*key)
+        return model
@@ -0,0 +1,154 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Prometheus text exposition without the client library. Metrics are per process: under gunicorn each worker
+# reports its own series, so scrape workers individually or sum them in the query.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+TOKEN_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144)
+
+# Spans of the request being served, for the Server-Timing header; None outside a request
+request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def label_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{label_text(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket
+                    lines.append(f"{self.name}_bucket{label_text(self.labels + ('le',), key + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_sum{label_text(self.labels, key)} {total}")
+                lines.append(f"{self.name}_count{label_text(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(f"{self.prefix}_{name}", help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, buckets, labels=()):
+        metric = Histogram(f"{self.prefix}_{name}", help_text, buckets, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def collect(self, name, stats):
+        # Numeric fields of an existing stats() dict, exported as gauges on every scrape
+        self.collectors.append((name, stats))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for name, stats in self.collectors:
+            for key, value in stats().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    metric = f"{self.prefix}_{name}_{key}"
+                    lines.extend([f"# TYPE {metric} gauge", f"{metric} {value}"])
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry("sql_agent")
+stage_seconds = registry.histogram("stage_seconds", "Time spent per pipeline stage", LATENCY_BUCKETS, ("stage",))
+request_seconds = registry.histogram(
+    "request_seconds", "HTTP request latency", LATENCY_BUCKETS, ("endpoint", "method", "status")
+)
+prompt_chars = registry.histogram("llm_prompt_chars", "Gemini prompt size", SIZE_BUCKETS, ("stage",))
+response_chars = registry.histogram("llm_response_chars", "Gemini response size", SIZE_BUCKETS, ("stage",))
+result_rows = registry.histogram("result_rows", "Rows returned per executed statement", ROW_BUCKETS)
+response_bytes = registry.histogram("response_bytes", "HTTP response body size", SIZE_BUCKETS, ("endpoint",))
+turn_seconds = registry.histogram("turn_seconds", "End-to-end /query latency per turn", LATENCY_BUCKETS, ("turn",))
+turn_tokens = registry.histogram(
+    "turn_prompt_tokens", "Prompt tokens per /query turn, sent or served from the prompt cache", TOKEN_BUCKETS,
+    ("turn", "part")
+)
+errors_total = registry.counter("stage_errors_total", "Stages that raised", ("stage",))
+
+
+@contextmanager
+def span(stage):
+    # Times one pipeline stage into stage_seconds and, inside a request, the Server-Timing breakdown
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        errors_total.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage)
+        spans = request_spans.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+
+
+def server_timing(spans):
+    # Same-named spans (e.g. several refinements) are summed, in order of first appearance
+    totals = {}
+    for stage, elapsed in spans:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    return ", ".join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in totals.items())
@@ -0,0 +1,74 @@
+import asyncio
+import contextvars
+from functools import partial
+
+# The /query pipeline is written once, as generators that yield the work they need done instead of doing it:
+#   Blocking(pool, func, *args)      a call that blocks its thread; pool is "db" for MySQL, "work" for the rest
+#   Generate(agent, prompt, stage)   a Gemini call through agent.generate / agent.generate_async
+#   Parallel(*steps)                 independent steps, results in order
+# run() performs each step in the calling thread (Flask); run_async() awaits it, with blocking calls on
+# executors (async_backend). The two serving modes differ only in how a step is awaited. A step that raises
+# has its exception thrown back into the generator at the yield.
+
+
+class Blocking:
+    def __init__(self, pool, func, *args, **kwargs):
+        self.pool = pool
+        self.call = partial(func, *args, **kwargs)
+
+
+class Generate:
+    def __init__(self, agent, prompt, stage):
+        self.agent = agent
+        self.prompt = prompt
+        self.stage = stage
+
+
+class Parallel:
+    def __init__(self, *steps):
+        self.steps = steps
+
+
+def perform(step):
+    if isinstance(step, Parallel):
+        return [perform(inner) for inner in step.steps]
+    if isinstance(step, Generate):
+        return step.agent.generate(step.prompt, step.stage)
+    return step.call()
+
+
+async def perform_async(step, executors):
+    # executors maps a Blocking pool name to an Executor; a missing name uses the loop's default executor
+    if isinstance(step, Parallel):
+        return list(await asyncio.gather(*(perform_async(inner, executors) for inner in step.steps)))
+    if isinstance(step, Generate):
+        return await step.agent.generate_async(step.prompt, step.stage)
+    # The copied context carries the request's Server-Timing spans into the executor thread
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(executors.get(step.pool), context.run, step.call)
+
+
+def run(steps):
+    value, error = None, None
+    while True:
+        try:
+            step = steps.send(value) if error is None else steps.throw(error)
+        except StopIteration as done:
+            return done.value
+        try:
+            value, error = perform(step), None
+        except Exception as e:
+            value, error = None, e
+
+
+async def run_async(steps, executors):
+    value, error = None, None
+    while True:
+        try:
+            step = steps.send(value) if error is None else steps.throw(error)
+        except StopIteration as done:
+            return done.value
+        try:
+            value, error = await perform_async(step, executors), None
+        except Exception as e:
+            value, error = None, e
@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from column_profile import profile_correlation, profile_counts
+
+# Plot data reduction: larger frames are binned, summarized or downsampled before rendering
+PLOT_POINT_THRESHOLD = int(os.getenv("PLOT_POINT_THRESHOLD", 50000))
+MAX_BAR_CATEGORIES = int(os.getenv("MAX_BAR_CATEGORIES", 50))
+MAX_PIE_CATEGORIES = int(os.getenv("MAX_PIE_CATEGORIES", 12))
+
+CHART_TYPES = ("histogram", "scatter plot", "box plot", "bar chart", "line graph", "pie chart", "heatmap")
+
+
+def is_supported(vis_type, columns):
+    if vis_type == "scatter plot":
+        return len(columns) >= 2
+    return vis_type in CHART_TYPES
+
+
+def histogram_bins(values, max_bins=200):
+    # Pre-binned counts: seaborn only ever sees len(edges) points, even for a KDE
+    values = pd.to_numeric(values, errors="coerce").dropna().to_numpy()
+    edges = np.histogram_bin_edges(values, bins="auto")
+    if len(edges) - 1 > max_bins:
+        edges = np.linspace(values.min(), values.max(), max_bins + 1)
+    counts, edges = np.histogram(values, bins=edges)
+    centers = (edges[:-1] + edges[1:]) / 2
+    return centers, counts, edges
+
+
+def box_stats(values, label, max_fliers=1000):
+    # Same statistics matplotlib.boxplot computes, from quantiles instead of every point
+    values = pd.to_numeric(values, errors="coerce").dropna().to_numpy()
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    low, high = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    inside = values[(values >= low) & (values <= high)]
+    fliers = values[(values < low) | (values > high)]
+    if len(fliers) > max_fliers:
+        fliers = np.random.default_rng(0).choice(fliers, max_fliers, replace=False)
+    return {
+        "label": label,
+        "med": median,
+        "q1": q1,
+        "q3": q3,
+        "whislo": inside.min() if len(inside) else q1,
+        "whishi": inside.max() if len(inside) else q3,
+        "fliers": fliers
+    }
+
+
+def minmax_downsample(series, max_points):
+    # Keeps each bucket's minimum and maximum so peaks and dips survive the reduction
+    n = len(series)
+    if n <= max_points:
+        return series
+    # Every row lands in a bucket: the last one is padded with NaN, which is never picked as a min or max
+    size = -(-n // (max_points // 2))
+    buckets = -(-n // size)
+    values = np.full(buckets * size, np.nan)
+    values[:n] = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+    values = values.reshape(buckets, size)
+    missing = np.isnan(values)
+    offsets = np.arange(buckets) * size
+    lows = offsets + np.where(missing, np.inf, values).argmin(axis=1)
+    highs = offsets + np.where(missing, -np.inf, values).argmax(axis=1)
+    positions = np.unique(np.minimum(np.concatenate([lows, highs, [n - 1]]), n - 1))
+    return series.iloc[positions]
+
+
+def downsample_frame(df, max_points):
+    if len(df) <= max_points:
+        return df
+    positions = set()
+    for column in df.columns:
+        reduced = minmax_downsample(df[column].reset_index(drop=True), max_points)
+        positions.update(reduced.index)
+    return df.iloc[sorted(positions)]
+
+
+def stratified_sample(df, x, y, n, grid=64, seed=0):
+    # Sample per 2D grid cell, keeping at least one point per occupied cell so sparse outliers stay visible
+    frame = df[[x, y]].dropna()
+    if len(frame) <= n:
+        return frame
+    xs = pd.to_numeric(frame[x], errors="coerce")
+    ys = pd.to_numeric(frame[y], errors="coerce")
+    if xs.isna().all() or ys.isna().all():
+        return frame.sample(n, random_state=seed)
+    cells = pd.cut(xs, grid, labels=False) * grid + pd.cut(ys, grid, labels=False)
+    shuffled = frame.assign(_cell=cells.to_numpy()).sample(frac=1.0, random_state=seed)
+    counts = shuffled['_cell'].map(shuffled['_cell'].value_counts())
+    quota = np.maximum(1, np.ceil(counts * n / len(frame)))
+    keep = shuffled.groupby('_cell', sort=False).cumcount() < quota
+    return shuffled[keep.to_numpy()].drop(columns='_cell')
+
+
+def top_categories(values, max_categories):
+    counts = values.value_counts()
+    if len(counts) <= max_categories:
+        return counts
+    top = counts.iloc[:max_categories - 1]
+    return pd.concat([top, pd.Series({"Other": counts.iloc[max_categories - 1:].sum()})])
+
+
+def category_counts(df, column, max_categories, profile):
+    counts = profile_counts(profile, column, max_categories) if profile else None
+    return counts if counts is not None else top_categories(df[column], max_categories)
+
+
+def correlation(df, profile):
+    # Numeric columns only; df.corr() over mixed dtypes raises in pandas 2
+    matrix = profile_correlation(profile) if profile else None
+    return matrix if matrix is not None else df.select_dtypes("number").corr()
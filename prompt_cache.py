@@ -0,0 +1,181 @@
+import asyncio
+import datetime
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from schema_retrieval import estimate_tokens
+
+# Every SQL prompt is a static prefix (instructions + schema) followed by a per-call delta (question,
+# conversation, error). PrefixCache remembers prefixes it has seen; the backend decides what that buys:
+#   local    (default) nothing is cached here: the full prompt is sent on every call and only prefix reuse is
+#            counted. Any saving comes from the provider's own implicit caching of the identical prefix.
+#   gemini   the prefix is uploaded once as Gemini cached content and later calls send only the delta.
+#            Prefixes under min_tokens (PROMPT_CACHE_MIN_TOKENS) are sent in full like local; the default
+#            follows Gemini's smallest explicit cache size. If Gemini rejects an upload, full prompts are sent.
+
+GEMINI_CACHE_MIN_TOKENS = 4096
+
+
+class LocalPrefixBackend:
+    name = "local"
+
+    def create(self, model, prefix):
+        return None
+
+    def bind(self, model, handle):
+        return model
+
+    def release(self, handle):
+        pass
+
+
+class GeminiContextBackend:
+    name = "gemini"
+
+    def __init__(self, ttl=3600, min_tokens=GEMINI_CACHE_MIN_TOKENS):
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+
+    def create(self, model, prefix):
+        # Only real Gemini models can be bound to cached content; fakes and wrappers send the full prompt
+        if estimate_tokens(prefix) < self.min_tokens or not hasattr(model, "model_name"):
+            return None
+        from google.generativeai import caching
+
+        return caching.CachedContent.create(
+            model=model.model_name, contents=[prefix], ttl=datetime.timedelta(seconds=self.ttl)
+        )
+
+    def bind(self, model, handle):
+        import google.generativeai as genai
+
+        return genai.GenerativeModel.from_cached_content(cached_content=handle)
+
+    def release(self, handle):
+        try:
+            handle.delete()
+        except Exception as e:
+            logging.warning(f"Could not delete cached content: {e}")
+
+
+def prompt_backend(name, ttl=3600, min_tokens=GEMINI_CACHE_MIN_TOKENS):
+    if name == "gemini":
+        return GeminiContextBackend(ttl, min_tokens)
+    if name != "local":
+        raise ValueError(f"Unknown PROMPT_CACHE backend: {name}")
+    return LocalPrefixBackend()
+
+
+def usage(response, sent_text, cached_tokens):
+    # Gemini reports real token counts; other models get the same four-characters estimate as the schema prompt
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is not None and getattr(metadata, "prompt_token_count", None):
+        return {
+            "prompt_tokens": metadata.prompt_token_count,
+            "cached_tokens": getattr(metadata, "cached_content_token_count", 0) or cached_tokens
+        }
+    return {"prompt_tokens": estimate_tokens(sent_text) + cached_tokens, "cached_tokens": cached_tokens}
+
+
+class PrefixCache:
+    def __init__(self, backend=None, max_entries=64, ttl=3600):
+        self.backend = backend or LocalPrefixBackend()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (bound model, handle, prefix tokens, created)
+        self.entries = OrderedDict()
+        # key -> Event set once the in-flight create() for that prefix has finished
+        self.creating = {}
+        self.hits = 0
+        self.misses = 0
+        self.tokens_reused = 0
+        self.tokens_not_sent = 0
+        self.lock = threading.Lock()
+
+    def key(self, model, prefix):
+        raw = f"{getattr(model, 'model_name', type(model).__name__)}\x00{prefix}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def prepare(self, model, prefix):
+        # Returns (model to call, whether the prefix must still be sent, prefix tokens held in the provider cache)
+        key = self.key(model, prefix)
+        while True:
+            now = time.time()
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None and now - entry[3] < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    self.tokens_reused += entry[2]
+                    if entry[1] is not None:
+                        self.tokens_not_sent += entry[2]
+                    return entry[0], entry[1] is None, entry[2] if entry[1] is not None else 0
+                # Single flight: concurrent misses on one prefix wait for the first caller's upload
+                waiting = self.creating.get(key)
+                if waiting is None:
+                    self.misses += 1
+                    stale = self.entries.pop(key, None)
+                    done = self.creating[key] = threading.Event()
+                    break
+            waiting.wait()
+
+        try:
+            if stale is not None and stale[1] is not None:
+                self.backend.release(stale[1])
+            tokens = estimate_tokens(prefix)
+            try:
+                handle = self.backend.create(model, prefix)
+            except Exception as e:
+                logging.warning(f"Prompt prefix cache unavailable, sending full prompts: {e}")
+                handle = None
+            bound = self.backend.bind(model, handle) if handle is not None else model
+
+            evicted = []
+            with self.lock:
+                if key in self.entries:
+                    # Lost a race with another inserter: keep theirs and release this upload
+                    evicted.append(handle)
+                    bound, handle = self.entries[key][0], self.entries[key][1]
+                else:
+                    self.entries[key] = (bound, handle, tokens, now)
+                while len(self.entries) > self.max_entries:
+                    evicted.append(self.entries.popitem(last=False)[1][1])
+            for old in evicted:
+                if old is not None:
+                    self.backend.release(old)
+            return bound, handle is None, 0
+        finally:
+            with self.lock:
+                self.creating.pop(key, None)
+            done.set()
+
+    def generate(self, model, prefix, delta):
+        bound, send_prefix, cached_tokens = self.prepare(model, prefix)
+        text = prefix + delta if send_prefix else delta
+        response = bound.generate_content(text)
+        return response, usage(response, text, cached_tokens)
+
+    async def generate_async(self, model, prefix, delta):
+        # Creating Gemini cached content is a blocking call; keep it off the event loop
+        bound, send_prefix, cached_tokens = await asyncio.get_running_loop().run_in_executor(
+            None, self.prepare, model, prefix
+        )
+        text = prefix + delta if send_prefix else delta
+        response = await bound.generate_content_async(text)
+        return response, usage(response, text, cached_tokens)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend.name,
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "prefix_tokens_reused": self.tokens_reused,
+                "prefix_tokens_not_sent": self.tokens_not_sent
+            }
@@ -0,0 +1,38 @@
+import threading
+import time
+
+
+class LLMLimiter:
+    # Caps concurrent Gemini calls and spaces them out to `rate` calls/second (token bucket of `burst`).
+    # Shared by every thread in the process, so concurrent batches draw on the same API quota.
+    def __init__(self, concurrency=0, rate=0, burst=1):
+        self.slots = threading.BoundedSemaphore(concurrency) if concurrency else None
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def __enter__(self):
+        if self.slots is not None:
+            self.slots.acquire()
+        self.wait()
+        return self
+
+    def __exit__(self, *exc):
+        if self.slots is not None:
+            self.slots.release()
@@ -0,0 +1,135 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+IDENTIFIER = re.compile(r"`([^`]+)`|\b([A-Za-z_][A-Za-z0-9_$]*)\b")
+WRITE_STATEMENTS = {"insert", "update", "delete", "replace", "create", "alter", "drop", "truncate", "rename", "load"}
+DDL_STATEMENTS = {"create", "alter", "drop", "truncate", "rename"}
+
+
+def normalize_sql(sql):
+    # Whitespace only; lowercasing would merge queries that differ in string literals
+    return " ".join(sql.split()).rstrip(";").strip()
+
+
+def statement_type(sql):
+    words = sql.split(None, 1)
+    return words[0].lower() if words else ""
+
+
+def sql_identifiers(sql):
+    return {quoted or bare for quoted, bare in IDENTIFIER.findall(sql)}
+
+
+def referenced_tables(sql, known_tables):
+    return sql_identifiers(sql) & set(known_tables)
+
+
+class CachedResult:
+    __slots__ = ("profile", "payload", "next_page", "tables", "versions", "expires", "size")
+
+    def __init__(self, profile, payload, next_page, tables=(), versions=None, expires=0.0):
+        self.profile = profile
+        self.payload = payload
+        self.next_page = next_page
+        self.tables = frozenset(tables)
+        self.versions = versions or {}
+        self.expires = expires
+        self.size = len(payload) + len(next_page or "") + 256
+
+
+class ResultCache:
+    def __init__(self, max_bytes, ttl, versions=None, version_ttl=5):
+        # versions(profile) -> {table: update_time}; polled at most every version_ttl seconds
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.versions = versions
+        self.version_ttl = version_ttl
+        self.version_memo = {}
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def key(self, profile, sql, limit, offset):
+        raw = f"{profile}\x00{limit}\x00{offset}\x00{normalize_sql(sql)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def table_versions(self, profile, tables):
+        if self.versions is None or not tables:
+            return {}
+        memo = self.version_memo.get(profile)
+        if memo is None or time.time() - memo[0] > self.version_ttl:
+            memo = self.version_memo[profile] = (time.time(), self.versions(profile))
+        return {table: memo[1].get(table) for table in tables}
+
+    def get(self, profile, sql, limit, offset=0):
+        if not self.max_bytes:
+            return None
+        key = self.key(profile, sql, limit, offset)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None:
+            if time.time() > entry.expires or self.table_versions(profile, entry.tables) != entry.versions:
+                with self.lock:
+                    self._remove(key)
+                entry = None
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, profile, sql, limit, offset, payload, next_page, tables):
+        entry = CachedResult(
+            profile,
+            payload,
+            next_page,
+            tables,
+            self.table_versions(profile, tables),
+            time.time() + self.ttl
+        )
+        if not self.max_bytes or entry.size > self.max_bytes:
+            return entry
+        key = self.key(profile, sql, limit, offset)
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = entry
+            self.bytes += entry.size
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, profile, tables):
+        tables = set(tables)
+        with self.lock:
+            self.version_memo.pop(profile, None)
+            stale = [key for key, entry in self.entries.items() if entry.profile == profile and entry.tables & tables]
+            for key in stale:
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
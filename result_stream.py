@@ -0,0 +1,163 @@
+import base64
+import decimal
+import hashlib
+import hmac
+import json
+import re
+from datetime import date, datetime, time, timedelta
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Batches an Arrow stream may hold back while a column is NULL in every row so far (see arrow_stream)
+ARROW_SCHEMA_BATCHES = 8
+TRAILING_LIMIT = re.compile(r"\blimit\s+\d+(\s*(,|offset)\s*\d+)?\s*$", re.IGNORECASE)
+
+
+def strip_sql(sql):
+    return sql.strip().rstrip(";").strip()
+
+
+def is_select(sql):
+    return strip_sql(sql).split(None, 1)[0].lower() in ("select", "with") if sql.strip() else False
+
+
+def paginate_sql(sql, limit, offset=0):
+    # Push the row limit into MySQL so oversized results are never sent over the wire
+    sql = strip_sql(sql)
+    if TRAILING_LIMIT.search(sql):
+        # A derived table keeps the inner LIMIT (and its ORDER BY) intact
+        return f"SELECT * FROM ({sql}) AS paged LIMIT {int(offset)}, {int(limit)}"
+    return f"{sql} LIMIT {int(offset)}, {int(limit)}"
+
+
+def json_default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return str(value)
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode('ascii')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    return json.dumps(payload, default=json_default, separators=(",", ":"))
+
+
+class PageTokens:
+    def __init__(self, secret):
+        self.secret = secret.encode("utf-8")
+
+    def _sign(self, body):
+        return hmac.new(self.secret, body, hashlib.sha256).hexdigest()[:32]
+
+    def encode(self, sql, profile, offset, page_size):
+        body = base64.urlsafe_b64encode(dumps({
+            "sql": sql,
+            "profile": profile,
+            "offset": offset,
+            "page_size": page_size
+        }).encode("utf-8"))
+        return f"{body.decode('ascii')}.{self._sign(body)}"
+
+    def decode(self, token):
+        body, _, signature = token.partition(".")
+        if not hmac.compare_digest(signature, self._sign(body.encode("ascii"))):
+            raise ValueError("Invalid page token")
+        return json.loads(base64.urlsafe_b64decode(body))
+
+
+def ndjson_stream(batches, meta):
+    # batches yields lists of row dicts; the last line reports totals
+    yield dumps({"type": "meta", **meta}) + "\n"
+    row_count = 0
+    for rows in batches:
+        row_count += len(rows)
+        yield dumps({"type": "rows", "rows": rows}) + "\n"
+    yield dumps({"type": "end", "row_count": row_count}) + "\n"
+
+
+class ChunkSink:
+    # File-like sink handing out whatever the Arrow writer produced since the last drain
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def arrow_available():
+    # Checked before a streaming response starts: once the generator runs, the 200 status is already sent
+    return pa is not None
+
+
+def stream_schema(tables):
+    # One schema for the whole stream: NULL columns take the type the other batches agree on; a column that
+    # is NULL in every batch seen so far becomes string, since the stream schema cannot change later. Decimal
+    # precision is inferred from the values seen, so it is widened to the maximum for later, larger values.
+    fields = []
+    for field in pa.unify_schemas([table.schema for table in tables]):
+        if pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        elif pa.types.is_decimal(field.type):
+            field = field.with_type(pa.decimal128(38, field.type.scale))
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def arrow_stream(batches, meta, schema_batches=ARROW_SCHEMA_BATCHES):
+    # The NDJSON meta line travels as schema metadata under b"meta"; an empty result is a stream with no columns.
+    # Batches are typed independently and cast to the stream schema. Up to schema_batches are held back while
+    # some column is still all NULL, so its type can come from a later batch.
+    metadata = {"meta": dumps(meta)}
+    sink = ChunkSink()
+    writer, schema, held = None, None, []
+    for rows in batches:
+        if not rows:
+            continue
+        held.append(pa.Table.from_pylist(rows))
+        if writer is None:
+            untyped = any(pa.types.is_null(field.type) for field in pa.unify_schemas([t.schema for t in held]))
+            if untyped and len(held) < schema_batches:
+                continue
+            schema = stream_schema(held)
+            writer = pa.ipc.new_stream(sink, schema.with_metadata(metadata))
+        for table in held:
+            writer.write_table(table.cast(schema))
+        held = []
+        yield sink.drain()
+    if writer is None:
+        schema = stream_schema(held) if held else pa.schema([])
+        writer = pa.ipc.new_stream(sink, schema.with_metadata(metadata))
+        for table in held:
+            writer.write_table(table.cast(schema))
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+
+# One round trip for every column of every table, including keys and foreign keys
+COLUMNS_QUERY = """
+SELECT c.TABLE_NAME AS table_name,
+       c.COLUMN_NAME AS column_name,
+       c.COLUMN_TYPE AS column_type,
+       c.IS_NULLABLE AS is_nullable,
+       c.COLUMN_KEY AS column_key,
+       k.REFERENCED_TABLE_NAME AS referenced_table,
+       k.REFERENCED_COLUMN_NAME AS referenced_column
+FROM information_schema.COLUMNS c
+LEFT JOIN information_schema.KEY_COLUMN_USAGE k
+       ON k.TABLE_SCHEMA = c.TABLE_SCHEMA
+      AND k.TABLE_NAME = c.TABLE_NAME
+      AND k.COLUMN_NAME = c.COLUMN_NAME
+      AND k.REFERENCED_TABLE_NAME IS NOT NULL
+WHERE c.TABLE_SCHEMA = %s
+ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+"""
+
+# Aggregated server side, so the change check returns a single row
+CHECKSUM_QUERY = """
+SELECT COUNT(*) AS column_count,
+       COALESCE(SUM(CRC32(CONCAT_WS('|', TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, COLUMN_KEY))), 0) AS checksum
+FROM information_schema.COLUMNS
+WHERE TABLE_SCHEMA = %s
+"""
+
+
+class SchemaCatalog:
+    def __init__(self, rows, checksum):
+        self.tables = {}
+        self.foreign_keys = []
+        self.checksum = checksum
+        self.loaded_at = time.time()
+        # Table ranking index, built on first use
+        self.index = None
+
+        for row in rows:
+            columns = self.tables.setdefault(row['table_name'], [])
+            if not columns or columns[-1]['name'] != row['column_name']:
+                columns.append({
+                    "name": row['column_name'],
+                    "type": row['column_type'],
+                    "nullable": row['is_nullable'] == "YES",
+                    "key": row['column_key'] or None
+                })
+            if row['referenced_table']:
+                self.foreign_keys.append((
+                    row['table_name'],
+                    row['column_name'],
+                    row['referenced_table'],
+                    row['referenced_column']
+                ))
+
+    def column_names(self):
+        return {table: [column['name'] for column in columns]
+                for table, columns in self.tables.items()}
+
+    def describe(self, tables=None):
+        tables = self.tables if tables is None else tables
+        lines = []
+        for table in tables:
+            columns = ", ".join(
+                f"{column['name']} {column['type']}" + (f" {column['key']}" if column['key'] else "")
+                for column in self.tables.get(table, [])
+            )
+            lines.append(f"Table {table} ({columns})")
+        for table, column, ref_table, ref_column in self.foreign_keys:
+            if table in tables:
+                lines.append(f"FK {table}.{column} -> {ref_table}.{ref_column}")
+        return "\n".join(lines)
+
+
+def schema_checksum(cursor, database):
+    cursor.execute(CHECKSUM_QUERY, (database,))
+    row = cursor.fetchone()
+    return f"{row['column_count']}:{row['checksum']}"
+
+
+def load_catalog(cursor, database):
+    checksum = schema_checksum(cursor, database)
+    cursor.execute(COLUMNS_QUERY, (database,))
+    return SchemaCatalog(cursor.fetchall(), checksum)
+
+
+class SchemaCache:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, cursor, database, refresh=False):
+        with self.lock:
+            catalog = self.entries.get(key)
+
+        if catalog and not refresh:
+            if time.time() - catalog.loaded_at < self.ttl:
+                return catalog
+            # TTL expired: only reload when the DDL checksum actually moved
+            if schema_checksum(cursor, database) == catalog.checksum:
+                catalog.loaded_at = time.time()
+                return catalog
+
+        catalog = load_catalog(cursor, database)
+        logging.info(f"Schema loaded for {database}: {len(catalog.tables)} tables")
+        with self.lock:
+            self.entries[key] = catalog
+        return catalog
+
+    def invalidate(self, key=None):
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
@@ -0,0 +1,120 @@
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+
+def stem(token):
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    # Splits snake_case, camelCase and plain words: "empHireDate" -> emp, hire, date
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    return [stem(token) for token in re.findall(r"[a-z0-9]+", text.lower())]
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text and SQL identifiers
+    return len(text) // 4 + 1
+
+
+class SchemaIndex:
+    def __init__(self, catalog, embed=None, cache_dir=None, k1=1.5, b=0.75):
+        self.catalog = catalog
+        self.k1 = k1
+        self.b = b
+        self.full_tokens = estimate_tokens(catalog.describe())
+        self.docs = {}
+        for table, columns in catalog.tables.items():
+            # The table name counts more than any single column
+            tokens = tokenize(table) * 3
+            for column in columns:
+                tokens += tokenize(column['name'])
+            self.docs[table] = Counter(tokens)
+        self.lengths = {table: sum(doc.values()) for table, doc in self.docs.items()}
+        self.avg_length = sum(self.lengths.values()) / max(len(self.docs), 1)
+        document_frequency = Counter(token for doc in self.docs.values() for token in doc)
+        n = len(self.docs)
+        self.idf = {token: math.log(1 + (n - df + 0.5) / (df + 0.5)) for token, df in document_frequency.items()}
+
+        self.embed = embed
+        self.vectors = None
+        if embed is not None:
+            self.vectors = self._load_vectors(cache_dir)
+
+    def _load_vectors(self, cache_dir):
+        path = None
+        if cache_dir:
+            path = os.path.join(cache_dir, f"schema-{self.catalog.checksum.replace(':', '-')}.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    cached = json.load(f)
+                return {table: np.asarray(vector) for table, vector in cached.items()}
+
+        tables = list(self.catalog.tables)
+        try:
+            vectors = self.embed([self.catalog.describe([table]) for table in tables], "retrieval_document")
+        except Exception as e:
+            logging.warning(f"Schema embedding failed, using lexical ranking only: {e}")
+            self.embed = None
+            return None
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(dict(zip(tables, [list(map(float, v)) for v in vectors])), f)
+        return {table: np.asarray(vector) for table, vector in zip(tables, vectors)}
+
+    def bm25(self, question):
+        terms = set(tokenize(question))
+        scores = {}
+        for table, doc in self.docs.items():
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[table] / self.avg_length)
+            for term in terms:
+                tf = doc.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores[table] = score
+        return scores
+
+    def scores(self, question, vector=None):
+        # vector: the question's embedding, when the caller already has it
+        scores = self.bm25(question)
+        if self.vectors:
+            top = max(scores.values()) or 1.0
+            try:
+                query = np.asarray(vector if vector is not None else self.embed([question], "retrieval_query")[0])
+            except Exception as e:
+                # Only this question falls back; the document vectors stay for the next one
+                logging.warning(f"Question embedding failed, using lexical ranking only: {e}")
+                return scores
+            query = query / (np.linalg.norm(query) or 1.0)
+            for table, vector in self.vectors.items():
+                similarity = float(vector @ query / (np.linalg.norm(vector) or 1.0))
+                # Blend normalized BM25 with cosine similarity
+                scores[table] = scores[table] / top + similarity
+        return scores
+
+    def top_tables(self, question, k, vector=None):
+        scores = self.scores(question, vector)
+        ranked = [table for table, score in sorted(scores.items(), key=lambda item: -item[1]) if score > 0]
+        if not ranked:
+            return None
+        selected = ranked[:k]
+        # Pull in FK neighbours (at most k of them) so the model can still write the JOINs
+        neighbours = []
+        for table, _, ref_table, _ in self.catalog.foreign_keys:
+            if table in selected and ref_table not in selected:
+                neighbours.append(ref_table)
+            elif ref_table in selected and table not in selected:
+                neighbours.append(table)
+        return selected + list(dict.fromkeys(neighbours))[:k]
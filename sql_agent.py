@@ -3,7 +3,9 @@ from flask_cors import CORS
 import google.generativeai as genai
 import mysql.connector
 import logging
+import os
 from datetime import datetime
+from db_pool import ConnectionPools
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:3000"])
@@ -79,25 +81,26 @@ Generate a corrected SQL query addressing the error. Return ONLY the SQL."""
             return False, str(e)
 
 class DatabaseManager:
-    def __init__(self):
-        self.connection = None
-        self.cursor = None
+    def __init__(self, pools):
+        self.pools = pools
+        self.profile = None
 
     def connect(self, host, user, password, database, port):
         try:
-            self.connection = mysql.connector.connect(
-                host=host,
-                user=user,
-                password=password,
-                database=database,
-                port=port,
-                autocommit=True
-            )
-            self.cursor = self.connection.cursor(dictionary=True)
+            self.profile = self.pools.register(host, user, password, database, port)
             return True, "Connected successfully"
         except mysql.connector.Error as err:
             return False, f"MySQL Error: {err}"
 
+    def run(self, action):
+        # Each call borrows its own pooled connection and cursor
+        with self.pools.connection(self.profile) as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                return action(connection, cursor)
+            finally:
+                cursor.close()
+
     def get_schema(self):
         try:
             schema = {}
@@ -110,24 +113,30 @@ class DatabaseManager:
             return False, str(e)
 
     def get_tables(self):
-        self.cursor.execute("SHOW TABLES")
-        return [row[f"Tables_in_{self.connection.database}"] for row in self.cursor.fetchall()]
+        def action(connection, cursor):
+            cursor.execute("SHOW TABLES")
+            return [row[f"Tables_in_{connection.database}"] for row in cursor.fetchall()]
+        return self.run(action)
 
     def get_columns(self, table):
-        self.cursor.execute(f"DESCRIBE {table}")
-        return [row['Field'] for row in self.cursor.fetchall()]
+        def action(connection, cursor):
+            cursor.execute(f"DESCRIBE {table}")
+            return [row['Field'] for row in cursor.fetchall()]
+        return self.run(action)
 
     def execute_query(self, query):
+        def action(connection, cursor):
+            cursor.execute(query)
+            if cursor.with_rows:
+                return cursor.fetchall()
+            return "Query executed successfully"
         try:
-            self.cursor.execute(query)
-            if self.cursor.with_rows:
-                return self.cursor.fetchall(), None
-            return "Query executed successfully", None
+            return self.run(action), None
         except mysql.connector.Error as err:
             return None, f"MySQL Error: {err}"
 
 # Initialize components
-db_manager = DatabaseManager()
+db_manager = DatabaseManager(ConnectionPools(int(os.getenv("DB_POOL_SIZE", 5)), float(os.getenv("DB_CHECKOUT_TIMEOUT", 10))))
 llm_agent = StatefulSQLAgent("API_KEY_HERE") #add your api key here
 
 @app.route('/api/connect', methods=['POST'])
@@ -1,11 +1,16 @@
-import google.generativeai as genai
 import mysql.connector
 import os
 
+from bulk_write import BulkWriter, BulkWriteError, split_statements
+from llm_backend import shared_model
+
+# Rows per transaction for scripts, executemany() and CSV loads
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 1000))
+
 class LLMAgent:
-    def __init__(self, api_key):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-1.5-flash")
+    def __init__(self, api_key, model=None):
+        # Any generate_content() backend works here; by default LLM_BACKEND decides (Gemini unless set)
+        self.model = model or shared_model(api_key=api_key)
 
     def convert_to_sql(self, user_query):
         prompt = (
@@ -46,10 +51,14 @@ class AuthenticationAgent:
 
 
 class DatabaseAgent:
-    def __init__(self, connection):
+    def __init__(self, connection, batch_size=BULK_BATCH_SIZE):
         self.connection = connection
+        self.batch_size = batch_size
 
     def execute_query(self, query):
+        # Several statements (e.g. one INSERT per row from the LLM) run as one transactional script
+        if len(split_statements(query)) > 1:
+            return self.execute_script(query)
         try:
             cursor = self.connection.cursor()
             cursor.execute(query)
@@ -61,6 +70,32 @@ class DatabaseAgent:
         except mysql.connector.Error as err:
             return f"Error: {err}"
 
+    def execute_script(self, script, atomic=True):
+        # Consecutive single-row INSERTs are merged into multi-row INSERTs of up to batch_size rows
+        try:
+            report = BulkWriter(self.connection, self.batch_size, atomic).run_script(script)
+        except BulkWriteError as err:
+            return f"Error: {err} (rolled back)" if atomic else f"Error: {err}"
+        if "result" in report:
+            return report["result"]
+        return f"Script executed successfully: {report['statements']} statements, {report['rows']} rows."
+
+    def execute_many(self, query, rows, atomic=False):
+        # One parameterized INSERT/UPDATE for many rows, batch_size rows per round trip and commit
+        try:
+            report = BulkWriter(self.connection, self.batch_size, atomic).insert_many(query, rows)
+        except BulkWriteError as err:
+            return f"Error: {err}"
+        return f"Query executed successfully: {report['rows']} rows in {report['batches']} batches."
+
+    def load_frame(self, table, df, create=False, atomic=False):
+        # Bulk load of a DataFrame, e.g. an uploaded CSV read with csv_ingest.read_csv_compact
+        try:
+            report = BulkWriter(self.connection, self.batch_size, atomic).load_frame(table, df, create)
+        except (BulkWriteError, mysql.connector.Error) as err:
+            return f"Error: {err}"
+        return f"Loaded {report['rows']} rows into {table} in {report['batches']} batches."
+
 
 class UserAgent:
     def __init__(self, auth_agent, llm_agent):
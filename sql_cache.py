@@ -0,0 +1,87 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_question(question):
+    # Only case, whitespace and trailing punctuation are folded; operators like < and > must survive
+    return " ".join(question.lower().split()).rstrip("?.!;")
+
+
+class SQLCache:
+    def __init__(self, max_entries=1000, ttl=86400, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.path = path
+        self.db = None
+        if path:
+            self.open()
+            # SQLite connections must not cross a fork (gunicorn --preload); each worker opens its own
+            os.register_at_fork(after_in_child=self.open)
+
+    def open(self):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS sql_cache (key TEXT PRIMARY KEY, sql TEXT, created REAL)"
+        )
+        self.db.commit()
+
+    def key(self, question, fingerprint):
+        raw = f"{fingerprint}\x00{normalize_question(question)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question, fingerprint):
+        key = self.key(question, fingerprint)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.db is not None:
+                row = self.db.execute("SELECT sql, created FROM sql_cache WHERE key = ?", (key,)).fetchone()
+                if row:
+                    entry = self.entries[key] = row
+                    while len(self.entries) > self.max_entries:
+                        self.entries.popitem(last=False)
+            if entry is not None and now - entry[1] < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._delete(key)
+            self.misses += 1
+            return None
+
+    def put(self, question, fingerprint, sql):
+        key = self.key(question, fingerprint)
+        entry = (sql, time.time())
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO sql_cache VALUES (?, ?, ?)", (key, *entry))
+                self.db.commit()
+
+    def _delete(self, key):
+        self.entries.pop(key, None)
+        if self.db is not None:
+            self.db.execute("DELETE FROM sql_cache WHERE key = ?", (key,))
+            self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
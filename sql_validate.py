@@ -0,0 +1,211 @@
+import difflib
+import re
+import threading
+
+try:
+    import sqlglot
+    from sqlglot import exp
+except ImportError:
+    sqlglot = None
+
+FENCE = re.compile(r"```[A-Za-z]*")
+STATEMENT_START = re.compile(
+    r"^\s*(select|with|insert|update|delete|replace|create|alter|drop|truncate|show|describe|desc|explain)\b",
+    re.IGNORECASE | re.MULTILINE
+)
+# Fallback without sqlglot: table references only, as columns cannot be scoped without a parser
+TABLE_REFERENCE = re.compile(r"\b(from|join|update|into)\s+(`?)([\w$]+)\2(\s*\.)?", re.IGNORECASE)
+CTE_NAME = re.compile(r"([\w$]+)`?\s+as\s*\(", re.IGNORECASE)
+QUOTES = "'\"`"
+
+
+def clean_sql(text):
+    # Model output minus markdown fences, prose before the first statement and anything after its semicolon
+    text = FENCE.sub("", text).strip()
+    match = STATEMENT_START.search(text)
+    if match:
+        text = text[match.start():]
+    quote = None
+    for position, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in QUOTES:
+            quote = char
+        elif char == ";":
+            return text[:position].strip()
+    return text.strip()
+
+
+def fold(name):
+    return name.lower().replace("_", "")
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def closest(name, candidates):
+    # The single nearest candidate within a small edit distance, ignoring case and underscores; None if ambiguous
+    key = fold(name)
+    same = [candidate for candidate in candidates if fold(candidate) == key]
+    if len(same) == 1:
+        return same[0]
+    if same:
+        return None
+    scored = sorted((edit_distance(key, fold(candidate)), candidate) for candidate in candidates)
+    if not scored or scored[0][0] > max(1, len(key) // 4):
+        return None
+    if len(scored) > 1 and scored[1][0] == scored[0][0]:
+        return None
+    return scored[0][1]
+
+
+def unknown(kind, name, candidates, where=""):
+    message = f"Unknown {kind} '{name}'{where}"
+    suggestions = difflib.get_close_matches(name, candidates, n=3, cutoff=0.5)
+    if suggestions:
+        return f"{message}; did you mean {', '.join(suggestions)}?"
+    return f"{message}; available: {', '.join(list(candidates)[:20])}"
+
+
+def check_tree(sql, tables):
+    try:
+        tree = sqlglot.parse_one(sql, read="mysql")
+    except sqlglot.errors.ParseError:
+        # Likely MySQL syntax sqlglot does not know; the server is the judge of that
+        return sql, [], []
+    if tree is None:
+        return sql, [], []
+
+    fixes, errors = [], []
+    derived = {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+    derived.update(subquery.alias.lower() for subquery in tree.find_all(exp.Subquery) if subquery.alias)
+    sources, missing = {name: None for name in derived}, set()
+    for table in tree.find_all(exp.Table):
+        name = table.name
+        if not name:
+            continue
+        if table.args.get("db") or name.lower() in derived:
+            # Another database or a CTE: its columns are not in this catalog
+            sources[table.alias_or_name.lower()] = None
+            continue
+        real = name if name in tables else closest(name, tables)
+        if real is None:
+            errors.append(unknown("table", name, tables))
+            missing.update({name.lower(), table.alias_or_name.lower()})
+            continue
+        if real != name:
+            table.set("this", exp.to_identifier(real))
+            fixes.append(f"table {name} -> {real}")
+        sources[table.alias_or_name.lower()] = real
+        sources[name.lower()] = real
+        sources[real.lower()] = real
+
+    referenced = {real for real in sources.values() if real}
+    output_aliases = {alias.alias.lower() for alias in tree.find_all(exp.Alias)}
+    for column in tree.find_all(exp.Column):
+        name, qualifier = column.name, column.table
+        if not name or isinstance(column.this, exp.Star):
+            continue
+        if qualifier:
+            if qualifier.lower() in missing:
+                continue
+            if qualifier.lower() not in sources:
+                errors.append(unknown("table or alias", qualifier, sorted(sources), f" for column '{name}'"))
+                continue
+            table = sources[qualifier.lower()]
+            if table is None:
+                continue
+            candidates, where = tables[table], f" in table '{table}'"
+        else:
+            candidates, where = sorted({c for table in referenced for c in tables[table]}), ""
+        if name.lower() in {candidate.lower() for candidate in candidates}:
+            continue
+        if not qualifier and (name.lower() in output_aliases or derived or missing):
+            # May be a select alias or come from a table we cannot see into
+            continue
+        real = closest(name, candidates)
+        if real is None:
+            errors.append(unknown("column", name, candidates, where))
+            continue
+        column.set("this", exp.to_identifier(real))
+        fixes.append(f"column {name} -> {real}")
+
+    if fixes:
+        sql = tree.sql(dialect="mysql")
+    return sql, fixes, errors
+
+
+def statement_depth_ok(sql, position):
+    # FROM inside EXTRACT(...)/TRIM(...)/SUBSTRING(...) is not a table reference; a subquery's FROM is
+    depth, start = 0, 0
+    for index in range(position - 1, -1, -1):
+        if sql[index] == ")":
+            depth += 1
+        elif sql[index] == "(":
+            if depth == 0:
+                start = index + 1
+                break
+            depth -= 1
+    return re.search(r"\b(select|delete|update|insert|replace)\b", sql[start:position], re.IGNORECASE) is not None
+
+
+def check_tables(sql, tables):
+    fixes, errors, replacements = [], [], []
+    ctes = {name.lower() for name in CTE_NAME.findall(sql)}
+    for match in TABLE_REFERENCE.finditer(sql):
+        name = match.group(3)
+        if match.group(4) or name.lower() in ctes or name.lower() == "dual" or name in tables:
+            continue
+        if not statement_depth_ok(sql, match.start()):
+            continue
+        real = closest(name, tables)
+        if real is None:
+            errors.append(unknown("table", name, tables))
+        else:
+            replacements.append((match.start(3), match.end(3), real))
+            fixes.append(f"table {name} -> {real}")
+    for start, end, real in reversed(replacements):
+        sql = sql[:start] + real + sql[end:]
+    return sql, fixes, errors
+
+
+class SQLValidator:
+    # Checks generated SQL against the cached schema before it costs a MySQL round trip. Near-miss identifiers
+    # are fixed in place, saving the failing round trip and the Gemini refinement it would have triggered;
+    # anything else is rejected with a precise error, saving the round trip.
+    def __init__(self):
+        self.counters = {
+            "checked": 0,
+            "fixed": 0,
+            "rejected": 0,
+            "llm_calls_saved": 0,
+            "round_trips_saved": 0
+        }
+        self.lock = threading.Lock()
+
+    def validate(self, sql, catalog):
+        tables = catalog.column_names()
+        check = check_tree if sqlglot is not None else check_tables
+        sql, fixes, errors = check(clean_sql(sql), tables)
+        with self.lock:
+            self.counters["checked"] += 1
+            if errors:
+                self.counters["rejected"] += 1
+                self.counters["round_trips_saved"] += 1
+            elif fixes:
+                self.counters["fixed"] += 1
+                self.counters["llm_calls_saved"] += 1
+                self.counters["round_trips_saved"] += 1
+        return sql, fixes, errors
+
+    def stats(self):
+        with self.lock:
+            return {**self.counters, "parser": "sqlglot" if sqlglot is not None else "regex"}
@@ -0,0 +1,71 @@
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class StateRecord:
+    __slots__ = ("state", "message", "timestamp")
+
+    def __init__(self, state, message, timestamp):
+        self.state = state
+        self.message = message
+        self.timestamp = timestamp
+
+    def to_dict(self):
+        return {
+            "state": self.state,
+            "message": self.message,
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat()
+        }
+
+
+class RequestTrace:
+    __slots__ = ("trace_id", "started", "states", "dropped", "max_message")
+
+    ids = itertools.count(1)
+
+    def __init__(self, max_states=50, max_message=500):
+        self.trace_id = next(self.ids)
+        self.started = time.time()
+        self.states = deque(maxlen=max_states)
+        self.dropped = 0
+        self.max_message = max_message
+
+    def log(self, state, message=None):
+        if len(self.states) == self.states.maxlen:
+            self.dropped += 1
+        if message and len(message) > self.max_message:
+            message = message[:self.max_message] + "..."
+        record = StateRecord(state, message, time.time())
+        self.states.append(record)
+        return record
+
+    def to_list(self):
+        return [record.to_dict() for record in self.states]
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "started": datetime.fromtimestamp(self.started).isoformat(),
+            "dropped": self.dropped,
+            "states": self.to_list()
+        }
+
+
+class TraceBuffer:
+    def __init__(self, size):
+        self.traces = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, trace):
+        if self.traces.maxlen:
+            with self.lock:
+                self.traces.append(trace)
+
+    def recent(self, limit=None):
+        with self.lock:
+            traces = list(self.traces)
+        traces.reverse()
+        return [trace.to_dict() for trace in traces[:limit]]